@@ -1,30 +1,61 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 from datetime import datetime
 import io
 import base64
-from reportlab.lib.pagesizes import A4, letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image, Table, TableStyle, HRFlowable
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import Paragraph, Spacer, PageBreak, Table
 from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from reportlab.pdfgen import canvas
-import tempfile
 import os
 import subprocess
+import shutil
+import hashlib
+import codecs
+import re
+import time
+import urllib.request
+import threading
+import pickle
+import json
+import collections
+import difflib
+import sqlite3
+import uuid
+import copy
+import sys
+import openpyxl
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pdf_export import (escape_markup, build_pdf_styles, build_pair_flowables, build_history_flowables,
+                        draw_page_footer, PageRef, ReviewDocTemplate, PDF_PAGE_LAYOUT, merge_pdf_parts)
+from survey_columns import parse_headers, build_gene_col_index
 
 # Version und Repository-Info
 GITHUB_REPO = "https://github.com/HeikoBre/screening-dashboard-sandbox"
 APP_VERSION = "1.0.0"  # Fallback-Version
 
+@st.cache_resource(show_spinner=False)
 def get_app_version():
-    """Versucht die App-Version aus verschiedenen Quellen zu ermitteln"""
+    """
+    Ermittelt die App-Version einmal pro Prozess: VERSION-Datei (Build/Deployment),
+    sonst git im App-Ordner (nur wenn git installiert ist), sonst APP_VERSION.
+    """
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    try:
+        version_file = os.path.join(app_dir, 'VERSION')
+        if os.path.exists(version_file):
+            with open(version_file, 'r') as f:
+                version = f.read().strip()
+            if version:
+                return version
+    except:
+        pass
+    if shutil.which('git') is None:
+        return APP_VERSION
     try:
         result = subprocess.run(
             ['git', 'describe', '--tags', '--abbrev=0'],
-            capture_output=True, text=True, timeout=2
+            capture_output=True, text=True, timeout=2, cwd=app_dir
         )
         if result.returncode == 0 and result.stdout.strip():
             return result.stdout.strip()
@@ -33,13 +64,13 @@ def get_app_version():
     try:
         result = subprocess.run(
             ['git', 'rev-parse', '--short', 'HEAD'],
-            capture_output=True, text=True, timeout=2
+            capture_output=True, text=True, timeout=2, cwd=app_dir
         )
         if result.returncode == 0 and result.stdout.strip():
             commit_hash = result.stdout.strip()
             branch_result = subprocess.run(
                 ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
-                capture_output=True, text=True, timeout=2
+                capture_output=True, text=True, timeout=2, cwd=app_dir
             )
             if branch_result.returncode == 0 and branch_result.stdout.strip():
                 branch = branch_result.stdout.strip()
@@ -47,164 +78,1193 @@ def get_app_version():
             return f"{APP_VERSION}-{commit_hash}"
     except:
         pass
-    try:
-        version_file = os.path.join(os.path.dirname(__file__), 'VERSION')
-        if os.path.exists(version_file):
-            with open(version_file, 'r') as f:
-                return f.read().strip()
-    except:
-        pass
     return APP_VERSION
 
 
+# Version für PDF-Infoseite und Sidebar (aus dem Prozess-Cache, kein git pro Rerun)
+APP_VERSION_LABEL = get_app_version()
+
+
 # ---------------------------------------------------------------------------
 # PATCH: Hilfsfunktionen für das neue (gene, disease) Datenmodell
 # ---------------------------------------------------------------------------
 
-def extract_gene_disease_from_col(col):
+def gd_key(gene, disease):
+    """Kurzform für den zusammengesetzten Schlüssel."""
+    return (gene, disease)
+
+
+# Antwortoptionen der LimeSurvey-Fragen
+ANSWER_JA   = 'Ja'
+ANSWER_NEIN = 'Nein'
+ANSWER_NA   = 'Ich kann diese Frage nicht beantworten'
+
+# Codes der Antwortmatrix (int8); alles andere Nicht-Leere zählt als ANSWER_OTHER
+ANSWER_CODES   = {ANSWER_JA: 0, ANSWER_NEIN: 1, ANSWER_NA: 2}
+ANSWER_OTHER   = 3
+ANSWER_MISSING = -1
+
+COUNT_COLUMNS = ['nat_ja', 'nat_nein', 'nat_na', 'nat_n',
+                 'wiss_ja', 'wiss_nein', 'wiss_na', 'wiss_n']
+
+
+def split_survey_columns(gene_col_index, gene_pairs):
+    """
+    Teilt die referenzierten Spalten in Frage- und Kommentarspalten auf
+    (jeweils in Paar-Reihenfolge, ohne Duplikate).
+    """
+    q_cols, kom_cols = {}, {}
+    for key in gene_pairs:
+        cols = gene_col_index[key]
+        for col in cols['nat_q'] + cols['wiss_q']:
+            q_cols.setdefault(col, None)
+        for col in cols['nat_kom'] + cols['wiss_kom']:
+            kom_cols.setdefault(col, None)
+    return list(q_cols), list(kom_cols)
+
+
+def encode_answers(df, q_cols):
+    """
+    Wandelt die Frage-Spalten in eine int8-Matrix (Responses × Spalten) um:
+    Ja=0, Nein=1, 'kann nicht beantworten'=2, sonstige Antwort=3, leer=-1.
+
+    Gibt ein dict zurück: 'codes' (np.ndarray) und 'columns' (Spaltenname ->
+    Spaltenposition in codes).
+    """
+    block = df[q_cols].to_numpy(dtype=object)
+    codes = pd.Categorical(block.ravel(), categories=list(ANSWER_CODES)).codes
+    codes = codes.astype(np.int8).reshape(block.shape)
+    codes[(codes == ANSWER_MISSING) & pd.notna(block)] = ANSWER_OTHER
+    return {
+        'codes': codes,
+        'columns': {col: pos for pos, col in enumerate(q_cols)},
+    }
+
+
+def build_answer_counts(answer_codes, gene_col_index, gene_pairs):
+    """
+    Zählt die Antworten aller (gene, disease) Paare in einem Durchgang.
+
+    Grundlage ist die int8-Antwortmatrix aus encode_answers(): pro Track
+    (nat/wiss) werden die Frage-Spalten ausgewählt, Codes spaltenweise
+    gezählt und die Spaltensummen anschließend den Paaren zugeordnet.
+
+    Gibt einen DataFrame zurück, indiziert mit (gene, disease), Spalten:
+        nat_ja, nat_nein, nat_na, nat_n, wiss_ja, wiss_nein, wiss_na, wiss_n
+    (n = Anzahl nicht-leerer Antworten)
+    """
+    index = pd.MultiIndex.from_tuples(gene_pairs, names=['gene', 'disease'])
+    counts = pd.DataFrame(0, index=index, columns=COUNT_COLUMNS, dtype='int64')
+    codes, columns = answer_codes['codes'], answer_codes['columns']
+
+    for track in ('nat', 'wiss'):
+        col_pos, positions = [], []
+        for pos, key in enumerate(gene_pairs):
+            for col in gene_col_index[key][f'{track}_q']:
+                col_pos.append(columns[col])
+                positions.append(pos)
+        if not col_pos:
+            continue
+
+        block = codes[:, col_pos]
+        per_col = {
+            'ja':   (block == ANSWER_CODES[ANSWER_JA]).sum(axis=0),
+            'nein': (block == ANSWER_CODES[ANSWER_NEIN]).sum(axis=0),
+            'na':   (block == ANSWER_CODES[ANSWER_NA]).sum(axis=0),
+            'n':    (block != ANSWER_MISSING).sum(axis=0),
+        }
+        for name, values in per_col.items():
+            counts[f'{track}_{name}'] = np.bincount(
+                positions, weights=values, minlength=len(gene_pairs)
+            ).astype('int64')
+
+    return counts
+
+
+# Größe der Byte-Stichprobe für die Encoding-Erkennung
+ENCODING_SAMPLE_BYTES = 64 * 1024
+
+
+def detect_encoding(file_bytes):
     """
-    Extrahiert (gene, disease) aus einem LimeSurvey-Spaltenheader.
-    Gibt (None, None) zurück wenn das Format nicht erkannt wird.
+    Bestimmt das Encoding anhand von BOM bzw. einer Byte-Stichprobe.
+    LimeSurvey exportiert UTF-8 mit BOM; ältere Exporte sind teils Latin-1.
     """
-    if 'Gen:' not in col or 'Erkrankung:' not in col:
-        return None, None
+    if file_bytes.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if file_bytes.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    sample = file_bytes[:ENCODING_SAMPLE_BYTES]
+    try:
+        sample.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # Abgeschnittenes Mehrbyte-Zeichen am Ende der Stichprobe ist kein Fehler
+        if e.start < len(sample) - 3:
+            return 'latin-1'
+    return 'utf-8'
 
-    gene_start = col.find('Gen:') + 4
-    while gene_start < len(col) and col[gene_start] in ' \xa0\t':
-        gene_start += 1
-    gene_end = col.find('Erkrankung:', gene_start)
-    if gene_end == -1:
-        return None, None
-    gene = col[gene_start:gene_end].strip(' \xa0\t')
 
-    disease_start = col.find('Erkrankung:') + 11
-    while disease_start < len(col) and col[disease_start] in ' \xa0\t':
-        disease_start += 1
-    disease_end = len(col)
-    for marker in [' [', '  ']:
-        pos = col.find(marker, disease_start)
-        if pos != -1 and pos < disease_end:
-            disease_end = pos
-    disease = col[disease_start:disease_end].strip(' \xa0\t')
-    return gene, disease
+def read_survey_csv(file_bytes, usecols=None):
+    """
+    Liest einen LimeSurvey-CSV-Export in einem Durchgang mit der C-Engine.
 
+    usecols (Spaltenpositionen) beschränkt das Einlesen auf diese Spalten;
+    None liest alle.
 
-def genes_compatible(g1, g2):
+    Gibt (df, parse_info) zurück; parse_info enthält 'encoding', 'engine'
+    und 'seconds' für die Anzeige auf der Übersichtsseite.
     """
-    True wenn zwei Gennamen als identisch gewertet werden sollen.
-    Behandelt den Fall dass LimeSurvey in national vs. wissenschaftlich
-    leicht abweichende Schreibweisen hat (z.B. BCL11 vs BCL11B, CD79A vs CD79).
-    Beide Richtungen werden geprüft (Prefix-Match).
+    encoding = detect_encoding(file_bytes)
+    engine = 'c'
+    start = time.perf_counter()
+
+    def read(**kwargs):
+        return pd.read_csv(io.BytesIO(file_bytes), sep=',', quotechar='"',
+                           encoding=encoding, engine=engine, **kwargs)
+
+    try:
+        df = read(usecols=usecols)
+    except UnicodeDecodeError:
+        # Stichprobe war UTF-8, spätere Bytes nicht
+        encoding = 'latin-1'
+        df = read(usecols=usecols)
+    except pd.errors.ParserError:
+        engine = 'python'
+        df = read(usecols=usecols)
+    parse_info = {
+        'encoding': encoding,
+        'engine': engine,
+        'seconds': time.perf_counter() - start,
+    }
+    return df, parse_info
+
+
+def read_survey_header(file_bytes):
+    """Liest nur die Kopfzeile eines Exports (leerer DataFrame mit Spalten)."""
+    encoding = detect_encoding(file_bytes)
+    try:
+        return pd.read_csv(io.BytesIO(file_bytes), sep=',', quotechar='"',
+                           encoding=encoding, nrows=0)
+    except (UnicodeDecodeError, pd.errors.ParserError):
+        return pd.read_csv(io.BytesIO(file_bytes), sep=',', quotechar='"',
+                           encoding='latin-1', engine='python', nrows=0)
+
+
+# Vorläufige Einstufung nach ≥80%-Cut-off; Index = Kategorie-Code
+CUTOFF_PCT = 80
+RECOMMENDATION_LABELS = [
+    'Aufnahme in nationales gNBS',
+    'Aufnahme in wissenschaftliche gNBS Studie',
+    'Keine Berücksichtigung im gNBS',
+]
+RECOMMENDATION_EMOJI = ['🟢', '🟡', '🔴']
+RECOMMENDATION_SHORT = ['🟢 National', '🟡 Studie', '🔴 Keine']
+
+NOT_RATED = 'Noch nicht bewertet'
+DECISION_OPTIONS = [
+    NOT_RATED,
+    '🟢 Aufnahme in nationales gNBS',
+    '🟡 Aufnahme in wissenschaftliche gNBS Studie',
+    '🔴 Keine Berücksichtigung im gNBS',
+    '⚪ Weitere Diskussion erforderlich',
+]
+DECISION_EMOJI_RE = re.compile(r'^(?:🟢|🟡|🔴|⚪) ')
+
+
+def classify_recommendations(national_pct, study_pct):
+    """
+    Umfrage-Empfehlung für alle Paare auf einmal:
+    ≥80% national -> 0, sonst ≥80% Studie -> 1, sonst 2.
+    Gibt ein pd.Categorical mit RECOMMENDATION_LABELS als Kategorien zurück.
     """
-    if g1 == g2:
-        return True
-    longer, shorter = (g1, g2) if len(g1) > len(g2) else (g2, g1)
-    return longer.startswith(shorter)
+    codes = np.select(
+        [np.asarray(national_pct) >= CUTOFF_PCT, np.asarray(study_pct) >= CUTOFF_PCT],
+        [0, 1], default=2
+    )
+    return pd.Categorical.from_codes(codes, categories=RECOMMENDATION_LABELS)
 
 
-def build_gene_col_index(df):
+def classify_deviations(recommendations, decisions):
+    """
+    Vergleicht Umfrage-Empfehlung und Expertenentscheidung (ohne Emoji).
+    Gibt (Abweichung_von_Umfrage, Abweichung_Details) als Arrays zurück.
     """
-    PATCH: Zentrales Parsing der Spalten.
+    recommendations = np.asarray(recommendations, dtype=object)
+    decisions = np.asarray(decisions, dtype=object)
+    not_rated = decisions == NOT_RATED
+    same = recommendations == decisions
+    deviation = np.select([not_rated, same], ['Nicht bewertet', 'Keine Abweichung'],
+                          default='Abweichung')
+    details = np.where(not_rated | same, '',
+                       'Umfrage: ' + recommendations + ' → Experten: ' + decisions)
+    return deviation, details
+
+
+def build_comment_store(comments_df, gene_col_index, gene_pairs):
+    """
+    Bereinigt alle Umfrage-Kommentare einmalig beim Import.
 
-    Baut einen Index der Form:
-        gene_col_index[(gene, disease)] = {
-            'nat_q':   [col, ...],   # nationale Frage-Spalten
-            'nat_kom': [col, ...],   # nationale Kommentar-Spalten
-            'wiss_q':  [col, ...],   # wissenschaftl. Frage-Spalten
-            'wiss_kom':[col, ...],   # wissenschaftl. Kommentar-Spalten
+    Zeilenumbrüche werden durch Leerzeichen ersetzt, leere Kommentare
+    entfernt. Gibt ein dict (gene, disease) -> {'nat', 'stud', 'nat_markup',
+    'stud_markup'} zurück; die *_markup-Varianten sind für ReportLab escaped.
+    Übersicht, Review-Tabs, CSV und PDF lesen alle aus diesem Store.
+    """
+    cleaned = comments_df.apply(
+        lambda col: col.dropna().astype(str)
+                       .str.replace(r'\r\n|[\r\n]', ' ', regex=True).str.strip()
+    )
+    cleaned = cleaned.where(cleaned != '')
+
+    store = {}
+    for key in gene_pairs:
+        cols = gene_col_index[key]
+        nat  = tuple(cleaned[cols['nat_kom']].stack().dropna())  if cols['nat_kom']  else ()
+        stud = tuple(cleaned[cols['wiss_kom']].stack().dropna()) if cols['wiss_kom'] else ()
+        store[key] = {
+            'nat': nat,
+            'stud': stud,
+            'nat_markup': tuple(escape_markup(c) for c in nat),
+            'stud_markup': tuple(escape_markup(c) for c in stud),
         }
+    return store
+
+
+def build_summary_df(comment_store, gene_col_index, gene_pairs, answer_counts):
+    """Baut die Übersichtstabelle (eine Zeile pro (gene, disease) Paar)."""
+    summary_data = []
+    for (gene, disease), counts in zip(gene_pairs, answer_counts.itertuples(index=False)):
+        cols = gene_col_index[(gene, disease)]
+
+        n_nat  = int(counts.nat_n)
+        n_stud = int(counts.wiss_n)
+
+        nat_ja   = counts.nat_ja  / n_nat  * 100 if n_nat  > 0 else 0
+        stud_ja  = counts.wiss_ja / n_stud * 100 if n_stud > 0 else 0
+
+        nat_comments  = comment_store[(gene, disease)]['nat']
+        stud_comments = comment_store[(gene, disease)]['stud']
+
+        # PATCH: Warnung wenn wiss-Spalten fehlen
+        wiss_missing = len(cols['wiss_q']) == 0
+
+        disease_display = disease[:1].upper() + disease[1:] if disease else ''
+        summary_data.append({
+            'Gen': gene,
+            'Erkrankung': disease_display,
+            # PATCH: Gene-Disease-Key als Tuple gespeichert für spätere Lookups
+            '_key': (gene, disease),
+            'National_Ja_pct': round(nat_ja, 1),
+            'National_n': n_nat,
+            'Studie_Ja_pct': round(stud_ja, 1),
+            'Studie_n': n_stud,
+            'National_80': 'Yes' if nat_ja >= 80 else 'No',
+            'Kommentare_National': ' | '.join(nat_comments) if nat_comments else '',
+            'Kommentare_Studie':   ' | '.join(stud_comments) if stud_comments else '',
+            'Wiss_fehlend': wiss_missing,
+        })
+    summary_df = pd.DataFrame(summary_data)
+    if summary_df.empty:
+        return summary_df
+    summary_df['Umfrage_Empfehlung'] = classify_recommendations(
+        summary_df['National_Ja_pct'], summary_df['Studie_Ja_pct']
+    )
+    return summary_df
+
+
+# Nur die im Spaltenindex referenzierten Gen-Spalten einlesen
+# (GNBS_SURVEY_ALL_COLUMNS=1 liest wie früher den kompletten Export ein)
+SURVEY_PROJECT_COLUMNS = os.environ.get('GNBS_SURVEY_ALL_COLUMNS', '0') != '1'
+
+# Anzahl verschiedener CSV-Exporte, die pro Prozess im Cache gehalten werden
+SURVEY_CACHE_ENTRIES = 8
+
+
+@st.cache_data(max_entries=SURVEY_CACHE_ENTRIES, show_spinner=False)
+def load_survey(file_hash, _file_bytes):
+    """
+    Parst einen Export und baut Spaltenindex, Zähltabelle und Übersicht.
+
+    Cache-Schlüssel ist allein der SHA-256 des Dateiinhalts (file_hash);
+    _file_bytes wird von st.cache_data nicht gehasht. Erneutes Hochladen
+    derselben Datei (z.B. nach "Neue CSV" oder Browser-Reload) ist damit
+    ohne erneutes Parsen sofort verfügbar.
+
+    Der rohe DataFrame wird nicht behalten: Frage-Spalten werden als
+    int8-Matrix kodiert und zu answer_counts aufsummiert, Freitext-Kommentare
+    landen bereinigt pro Paar in comment_store; beide Zwischenstufen werden
+    danach verworfen.
+    Mit SURVEY_PROJECT_COLUMNS werden Spaltenindex und header_table einmal
+    aus der vollständigen Kopfzeile gebaut und anschließend nur die
+    referenzierten Gen-Spalten eingelesen; Metadaten wie Antwort ID,
+    IP-Adresse oder Zugangscode werden gar nicht erst geparst.
+
+    Gibt ein dict zurück, dessen Schlüssel den session_state-Namen entsprechen:
+        comment_store, header_table, gene_col_index, gene_pairs,
+        answer_counts, summary_df, total_responses, parse_info
+    """
+    if SURVEY_PROJECT_COLUMNS:
+        header = read_survey_header(_file_bytes)
+        header_table = parse_headers(header.columns)
+        gene_col_index, gene_pairs = build_gene_col_index(header, header_table)
+        q_cols, kom_cols = split_survey_columns(gene_col_index, gene_pairs)
+        wanted = set(q_cols + kom_cols)
+        # Ohne Gen-Spalten wird nichts eingelesen (leere Liste statt None = alle)
+        usecols = [pos for pos, col in enumerate(header.columns) if col in wanted]
+        df, parse_info = read_survey_csv(_file_bytes, usecols=usecols)
+        df.columns = header.columns[usecols]
+    else:
+        df, parse_info = read_survey_csv(_file_bytes)
+        header = df
+        header_table = parse_headers(df.columns)
+        gene_col_index, gene_pairs = build_gene_col_index(df, header_table)
+        q_cols, kom_cols = split_survey_columns(gene_col_index, gene_pairs)
+    # Eingelesene / insgesamt vorhandene Spalten
+    parse_info['columns'] = (len(df.columns), len(header.columns))
+    answer_counts = build_answer_counts(encode_answers(df, q_cols), gene_col_index, gene_pairs)
+    comment_store = build_comment_store(df[kom_cols], gene_col_index, gene_pairs)
+    summary_df = build_summary_df(comment_store, gene_col_index, gene_pairs, answer_counts)
+    return {
+        'comment_store': comment_store,
+        'header_table': header_table,
+        'gene_col_index': gene_col_index,
+        'gene_pairs': gene_pairs,
+        'answer_counts': answer_counts,
+        'summary_df': summary_df,
+        'total_responses': len(df),
+        'parse_info': parse_info,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Referenzdaten (Teilnehmer, Erkrankungsgruppen, NBS-Overlap, Studien)
+# ---------------------------------------------------------------------------
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
 
-    Der Schlüssel ist immer der Genname + Erkrankung aus den NATIONALEN Spalten.
-    Wissenschaftliche Spalten werden per genes_compatible() + Erkrankungsname
-    zugeordnet (robust gegenüber BCL11/BCL11B- und CD79A/CD79-Tippfehlern).
+# Quelle der Referenzdaten: 'local' liest die mitgelieferten Dateien aus docs/
+# (Standard, funktioniert offline), 'remote' lädt sie aus dem GitHub-Repository
+# und fällt bei Netzwerkfehlern auf die lokalen Dateien zurück.
+REFERENCE_SOURCE = os.environ.get('GNBS_REFERENCE_SOURCE', 'local')
+REFERENCE_DIR = os.environ.get('GNBS_REFERENCE_DIR', os.path.join(APP_DIR, 'docs'))
+REFERENCE_BASE_URL = os.environ.get(
+    'GNBS_REFERENCE_URL',
+    "https://raw.githubusercontent.com/HeikoBre/screening-dashboard-sandbox/main/docs"
+)
+REFERENCE_TIMEOUT = 10  # Sekunden pro Request
+
+DEFAULT_DISEASE_GROUPS = [
+    'Metabolisch', 'Renal', 'Kardiovaskulär', 'Hämatologisch',
+    'Immunologisch', 'Neurologisch', 'Endokrinologisch',
+    'Muskuloskelettal', 'Sonstige'
+]
+
+
+def fetch_reference_file(filename, source=REFERENCE_SOURCE):
+    """
+    Liest eine Datei aus docs/ – lokal oder (source='remote') aus dem
+    Repository mit Timeout. Schlägt der Remote-Abruf fehl, wird die lokale
+    Datei verwendet, sofern vorhanden.
+    """
+    local_path = os.path.join(REFERENCE_DIR, filename)
+    if source == 'remote':
+        try:
+            with urllib.request.urlopen(f"{REFERENCE_BASE_URL}/{filename}",
+                                        timeout=REFERENCE_TIMEOUT) as response:
+                return response.read()
+        except OSError:
+            if not os.path.exists(local_path):
+                raise
+    with open(local_path, 'rb') as f:
+        return f.read()
+
+
+def load_attendees(source=REFERENCE_SOURCE):
+    """Namen/Kürzel der Teilnehmer: dict Name -> Kürzel."""
+    names_content = fetch_reference_file('names.csv', source).decode('utf-8-sig')
+    names_df = pd.read_csv(io.StringIO(names_content))
+    return dict(zip(names_df['Name'], names_df['Kürzel']))
+
+
+def load_disease_groups(source=REFERENCE_SOURCE):
+    """Liste der Erkrankungsgruppen."""
+    groups_content = fetch_reference_file('disease_groups.csv', source).decode('utf-8-sig')
+    groups_df = pd.read_csv(io.StringIO(groups_content))
+    return groups_df['Gruppe'].dropna().tolist()
+
+
+def load_nbs_overlap(source=REFERENCE_SOURCE):
+    """NBS/NGS2025 Overlap: dict Gen -> Gruppe."""
+    overlap_content = fetch_reference_file('Overlap_annotated_NBS.csv', source).decode('utf-8-sig')
+    overlap_df = pd.read_csv(io.StringIO(overlap_content), sep=';')
+    return dict(zip(overlap_df['Gene'], overlap_df['Group']))
+
+
+PROSPECTIVE_STUDIES = ['BabyScreen+', 'Guardian', 'Generation Study', 'Beacons']
+
+# Ablage für aus Excel konvertierte Referenzdaten (JSON, Schlüssel = Inhalts-Hash);
+# im App-Ordner statt im gemeinsam beschreibbaren Temp-Verzeichnis
+REFERENCE_CACHE_DIR = os.environ.get('GNBS_CACHE_DIR', os.path.join(APP_DIR, 'cache'))
+
+
+def parse_prospective_studies(xlsx_bytes):
+    """
+    Liest alle Studien-Blätter in einem Durchgang (openpyxl, read-only, nur
+    die Spalten Gene/Disorder). Fehlende Blätter werden übersprungen.
+
+    Gibt dict Gen -> {Studie: Disorder} zurück.
+    """
+    workbook = openpyxl.load_workbook(io.BytesIO(xlsx_bytes), read_only=True, data_only=True)
+    try:
+        memberships = {}
+        for study in PROSPECTIVE_STUDIES:
+            if study not in workbook.sheetnames:
+                continue
+            rows = workbook[study].iter_rows(values_only=True)
+            header = list(next(rows, ()))
+            gene_idx, disorder_idx = header.index('Gene'), header.index('Disorder')
+            for row in rows:
+                gene = row[gene_idx] if gene_idx < len(row) else None
+                if gene is None:
+                    continue
+                disorder = row[disorder_idx] if disorder_idx < len(row) else None
+                memberships.setdefault(str(gene), {})[study] = str(disorder)
+        return memberships
+    finally:
+        workbook.close()
+
+
+def load_prospective_studies(source=REFERENCE_SOURCE):
+    """
+    Prospektive Studien: dict Gen -> {Studie: Disorder}.
+
+    Das Ergebnis wird beim ersten Laden als JSON unter REFERENCE_CACHE_DIR
+    abgelegt (Schlüssel: SHA-256 der Excel-Datei); spätere Starts mit
+    unveränderter Datei überspringen openpyxl. Unlesbare oder unpassende
+    Cache-Dateien werden gelöscht und neu erzeugt.
+    """
+    xlsx_bytes = fetch_reference_file('Prospective_studies.xlsx', source)
+    digest = hashlib.sha256(xlsx_bytes).hexdigest()[:16]
+    cache_path = os.path.join(REFERENCE_CACHE_DIR, f'prospective_studies_{digest}.json')
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            memberships = json.load(f)
+        if isinstance(memberships, dict) and all(
+                isinstance(studies, dict) and all(isinstance(v, str) for v in studies.values())
+                for studies in memberships.values()):
+            return memberships
+        raise ValueError('unerwartetes Format')
+    except FileNotFoundError:
+        pass
+    except Exception:
+        try:
+            os.remove(cache_path)
+        except OSError:
+            pass
+
+    memberships = parse_prospective_studies(xlsx_bytes)
+    try:
+        os.makedirs(REFERENCE_CACHE_DIR, exist_ok=True)
+        tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(memberships, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    return memberships
+
+
+# Name -> (Loader, Fallback-Factory bei Fehler/Timeout)
+REFERENCE_LOADERS = {
+    'attendees_list':      (load_attendees,      dict),
+    'disease_groups_list': (load_disease_groups, lambda: list(DEFAULT_DISEASE_GROUPS)),
+    'nbs_overlap':         (load_nbs_overlap,    dict),
+    'prospective_studies': (load_prospective_studies, dict),
+}
+
+
+# Gültigkeitsdauer der geteilten Referenzdaten; fehlgeschlagene Loads werden
+# früher erneut versucht
+REFERENCE_TTL = 6 * 60 * 60           # Sekunden
+REFERENCE_RETRY_AFTER_ERROR = 60      # Sekunden
+
+
+class ReferenceDataCache:
+    """
+    Prozessweiter Cache der Referenzdaten, von allen Sessions geteilt.
+
+    Pro Eintrag wird ein Future aus dem Thread-Pool gehalten. Abgelaufene
+    Einträge (TTL) werden beim nächsten Zugriff neu geladen; invalidate()
+    verwirft alle Einträge und kann für das nächste Laden eine andere Quelle
+    vorgeben (z.B. einmalig 'remote' für eine Aktualisierung aus dem
+    Repository), spätere Loads nutzen wieder die konfigurierte Quelle. Bis
+    ein Neuladen fertig ist, bleibt das zuletzt fertige Future abrufbar
+    (completed()), damit die Sessions solange den alten Stand zeigen. Die
+    geladenen Objekte werden nicht kopiert und dürfen von den Sessions daher
+    nicht verändert werden.
+    """
+
+    def __init__(self, ttl=REFERENCE_TTL, source=REFERENCE_SOURCE):
+        self.ttl = ttl
+        self.source = source
+        self._next_source = None   # einmalige Quelle für den nächsten Ladevorgang
+        self._executor = ThreadPoolExecutor(max_workers=len(REFERENCE_LOADERS),
+                                            thread_name_prefix='reference-data')
+        self._lock = threading.Lock()
+        self._entries = {}   # name -> (future, submitted_at)
+        self._completed = {}   # name -> zuletzt fertiges Future, während neu geladen wird
+
+    def _expired(self, future, submitted_at):
+        if not future.done():
+            return False
+        age = time.monotonic() - submitted_at
+        if future.exception() is not None:
+            return age > REFERENCE_RETRY_AFTER_ERROR
+        return age > self.ttl
+
+    def futures(self):
+        """Futures aller Referenzdaten; fehlende/abgelaufene werden gestartet."""
+        with self._lock:
+            source = self._next_source or self.source
+            for name, (loader, _) in REFERENCE_LOADERS.items():
+                entry = self._entries.get(name)
+                if entry is None or self._expired(*entry):
+                    if entry is not None:
+                        self._completed[name] = entry[0]
+                    self._entries[name] = (self._executor.submit(loader, source),
+                                           time.monotonic())
+            self._next_source = None
+            return {name: future for name, (future, _) in self._entries.items()}
+
+    def invalidate(self, source=None):
+        """Verwirft alle Einträge; der nächste Zugriff lädt neu (einmalig aus source, falls angegeben)."""
+        with self._lock:
+            self._next_source = source
+            for name, (future, _) in self._entries.items():
+                if future.done():
+                    self._completed[name] = future
+            self._entries.clear()
+
+    def completed(self):
+        """Zuletzt fertige Futures der Einträge, die gerade neu geladen werden."""
+        with self._lock:
+            return dict(self._completed)
+
+
+@st.cache_resource
+def get_reference_cache():
+    """Einzige ReferenceDataCache-Instanz pro Prozess."""
+    return ReferenceDataCache()
+
+
+def read_reference_data():
+    """
+    Liest den aktuellen Stand aus dem geteilten Cache.
 
     Gibt zurück:
-        gene_col_index  – dict wie oben beschrieben
-        gene_pairs      – geordnete Liste von (gene, disease) Tupeln
-        gene_display    – dict (gene, disease) -> disease string (für Anzeige)
+        data     – dict Name -> Wert (None nur beim ersten Laden, während
+                   eines Neuladens der letzte fertige Stand; Fallback bei
+                   Fehler/Timeout)
+        errors   – dict Name -> Fehlermeldung
+        pending  – Liste der Namen, die noch geladen werden
     """
-    # Schritt 1: nationale Spalten einlesen
-    nat_entries = {}   # (gene, disease) -> {'q': col, 'kom': col}
-    nat_order = []     # Reihenfolge beibehalten
+    data, errors, pending = {}, {}, []
+    cache = get_reference_cache()
+    completed = cache.completed()
+    for name, future in cache.futures().items():
+        if not future.done():
+            pending.append(name)
+            future = completed.get(name)
+            if future is None:
+                data[name] = None
+                continue
+        try:
+            data[name] = future.result()
+        except Exception as e:
+            data[name] = REFERENCE_LOADERS[name][1]()
+            errors[name] = str(e)
+    return data, errors, pending
+
+
+@st.fragment(run_every=1)
+def reference_data_watcher(pending):
+    """Prüft jede Sekunde, ob ein ausstehender Load fertig ist, und rendert dann neu."""
+    futures = get_reference_cache().futures()
+    if any(futures[name].done() for name in pending):
+        st.rerun()
 
-    for col in df.columns:
-        if 'nationalen' not in col:
-            continue
-        gene, disease = extract_gene_disease_from_col(col)
-        if not gene:
-            continue
-        key = (gene, disease)
-        if key not in nat_entries:
-            nat_entries[key] = {'q': None, 'kom': None}
-            nat_order.append(key)
-        if '[Kommentar]' in col:
-            nat_entries[key]['kom'] = col
+
+# ---------------------------------------------------------------------------
+# Persistente Review-Sitzungen (SQLite, WAL)
+# ---------------------------------------------------------------------------
+
+# Ablage der Sitzungen; leerer Wert schaltet Autosave und Fortsetzen ab
+SESSION_DB_PATH = os.environ.get(
+    'GNBS_SESSION_DB', os.path.join(APP_DIR, 'sessions', 'review_sessions.sqlite')
+)
+SESSION_AUTOSAVE_DELAY = 1.0   # Sekunden, Änderungen werden gesammelt geschrieben
+SESSION_LIST_LIMIT = 20
+
+# session_state-Felder, die mit der Sitzung gespeichert und beim Fortsetzen
+# wiederhergestellt werden (Entscheidungen/Notizen liegen pro Paar)
+SESSION_META_KEYS = [
+    'survey_name', 'selected_attendees', 'additional_attendees', 'attendees_confirmed',
+    'selected_disease_group', 'group_confirmed', 'review_started', 'current_pair_idx',
+]
+
+SESSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS review_sessions (
+    survey_hash TEXT NOT NULL,
+    session_id  TEXT NOT NULL,
+    meta        TEXT NOT NULL,
+    created     REAL NOT NULL,
+    updated     REAL NOT NULL,
+    PRIMARY KEY (survey_hash, session_id)
+);
+CREATE TABLE IF NOT EXISTS review_pairs (
+    survey_hash TEXT NOT NULL,
+    session_id  TEXT NOT NULL,
+    gene        TEXT NOT NULL,
+    disease     TEXT NOT NULL,
+    decision    TEXT NOT NULL,
+    note        TEXT NOT NULL,
+    updated     REAL NOT NULL,
+    PRIMARY KEY (survey_hash, session_id, gene, disease)
+);
+-- Änderungsprotokoll, nur INSERT. value (JSON): decision [alt, neu],
+-- note Diff-Operationen (note_diff), attendees Liste der Anwesenden
+CREATE TABLE IF NOT EXISTS review_events (
+    survey_hash TEXT NOT NULL,
+    session_id  TEXT NOT NULL,
+    ts          REAL NOT NULL,
+    author      TEXT NOT NULL,
+    gene        TEXT,
+    disease     TEXT,
+    field       TEXT NOT NULL,
+    value       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS review_events_session ON review_events (survey_hash, session_id);
+"""
+
+
+def note_diff(old, new):
+    """Kompakte Änderung einer Notiz: Liste von [i1, i2, Text] (old[i1:i2] wird zu Text)."""
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    return [[i1, i2, new[j1:j2]] for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+
+def apply_note_diff(old, ops):
+    """Wendet note_diff-Operationen auf den alten Notiztext an."""
+    for i1, i2, text in reversed(ops):
+        old = old[:i1] + text + old[i2:]
+    return old
+
+
+def iter_review_events(rows):
+    """
+    Spielt Protokollzeilen (ts, author, gene, disease, field, value) der Reihe
+    nach ab und liefert pro Zeile ein dict mit 'time', 'author', 'key',
+    'field' sowie dem vollständigen alten und neuen Wert ('old', 'new').
+    """
+    notes, attendees = {}, None
+    for ts, author, gene, disease, field, value in rows:
+        key = (gene, disease) if gene is not None else None
+        value = json.loads(value)
+        if field == 'decision':
+            old, new = value
+        elif field == 'note':
+            old = notes.get(key, '')
+            new = notes[key] = apply_note_diff(old, value)
         else:
-            nat_entries[key]['q'] = col
+            old, new = attendees, value
+            attendees = value
+        yield {'time': ts, 'author': author, 'key': key, 'field': field, 'old': old, 'new': new}
 
-    # Schritt 2: wissenschaftliche Spalten einlesen
-    wiss_raw = {}   # (gene_wiss, disease_wiss) -> {'q': col, 'kom': col}
-    for col in df.columns:
-        if 'wissenschaftlicher' not in col:
-            continue
-        gene, disease = extract_gene_disease_from_col(col)
-        if not gene:
-            continue
-        key = (gene, disease)
-        if key not in wiss_raw:
-            wiss_raw[key] = {'q': None, 'kom': None}
-        if '[Kommentar]' in col:
-            wiss_raw[key]['kom'] = col
+
+def replay_review_events(rows, until=None):
+    """
+    Stand einer Sitzung zum Zeitpunkt until (Unix-Zeit, None = aktuell) aus
+    dem Änderungsprotokoll: (decisions, notes, attendees). Enthält nur
+    protokollierte Paare; für alle anderen gilt die Umfrage-Empfehlung.
+    """
+    decisions, notes, attendees = {}, {}, None
+    for event in iter_review_events(rows):
+        if until is not None and event['time'] > until:
+            break
+        if event['field'] == 'decision':
+            decisions[event['key']] = event['new']
+        elif event['field'] == 'note':
+            notes[event['key']] = event['new']
         else:
-            wiss_raw[key]['q'] = col
-
-    # Schritt 3: nationale Einträge mit wissenschaftlichen matchen
-    # Matching-Priorität:
-    #   1. Exakter Genname  + Erkrankung ist Substring
-    #   2. Kompatibler Genname + Erkrankung ist Substring  (BCL11 ↔ BCL11B)
-    #   3. Kompatibler Genname allein                      (CD79A ↔ CD79, korrupter Erkrankungsname)
-    gene_col_index = {}
-    for (nat_gene, nat_disease) in nat_order:
-        nat_disease_norm = nat_disease.lower().strip()
-        best_match = None
-        best_priority = 99
-
-        for (wiss_gene, wiss_disease), wiss_cols in wiss_raw.items():
-            wiss_disease_norm = wiss_disease.lower().strip()
-            gene_ok = genes_compatible(nat_gene, wiss_gene)
-            exact_gene = (nat_gene == wiss_gene)
-            disease_ok = (nat_disease_norm in wiss_disease_norm or
-                          wiss_disease_norm in nat_disease_norm)
-
-            if exact_gene and disease_ok:
-                priority = 1
-            elif gene_ok and disease_ok:
-                priority = 2
-            elif gene_ok:
-                priority = 3
+            attendees = event['new']
+    return decisions, notes, attendees
+
+
+class ReviewSessionStore:
+    """
+    Prozessweiter Speicher der Review-Sitzungen in SQLite (WAL-Modus),
+    Schlüssel (survey_hash, session_id).
+
+    save() legt Änderungen nur in einen Puffer; ein Writer-Thread schreibt sie
+    nach SESSION_AUTOSAVE_DELAY gesammelt in einer Transaktion (Debounce).
+    Pro Paar wird nur der letzte Stand geschrieben, und nur Paare, die im
+    Review geändert wurden – beim Fortsetzen gelten für alle anderen die
+    Umfrage-Empfehlungen.
+
+    log_event() hängt Änderungen zusätzlich an das Protokoll review_events
+    an (in derselben Transaktion); Notizen werden dort als Diff zum zuletzt
+    protokollierten Text abgelegt, unveränderte Werte gar nicht.
+    """
+
+    def __init__(self, path, delay=SESSION_AUTOSAVE_DELAY):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.delay = delay
+        self.last_error = None
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SESSION_SCHEMA)
+        self._db_lock = threading.Lock()
+        self._pending_lock = threading.Condition()
+        self._pending = {}   # (survey_hash, session_id) -> {'meta': dict, 'pairs': {key: (decision, note)}}
+        self._events = []    # (ts, survey_hash, session_id, author, key, field, old, new)
+        self._logged = {}    # (survey_hash, session_id, key, field) -> zuletzt protokollierter Wert
+        threading.Thread(target=self._writer, name='review-session-writer', daemon=True).start()
+
+    def save(self, survey_hash, session_id, meta, pairs=None):
+        """Merkt Metadaten und geänderte Paare (key -> (decision, note)) zum Schreiben vor."""
+        with self._pending_lock:
+            entry = self._pending.setdefault((survey_hash, session_id), {'meta': None, 'pairs': {}})
+            entry['meta'] = meta
+            entry['pairs'].update(pairs or {})
+            self._pending_lock.notify()
+
+    def log_event(self, survey_hash, session_id, author, key, field, old, new):
+        """
+        Merkt eine Änderung für das Protokoll vor. field: 'decision', 'note'
+        (key = (gene, disease)) oder 'attendees' (key = None, new = Namensliste).
+        """
+        with self._pending_lock:
+            self._events.append((time.time(), survey_hash, session_id, author, key, field, old, new))
+            self._pending_lock.notify()
+
+    def _writer(self):
+        while True:
+            with self._pending_lock:
+                while not self._pending and not self._events:
+                    self._pending_lock.wait()
+            time.sleep(self.delay)
+            self.flush()
+
+    def flush(self):
+        """
+        Schreibt alle vorgemerkten Änderungen in einer Transaktion. Flushes
+        laufen nacheinander (_db_lock vor dem Übernehmen des Puffers bis nach
+        dem Commit), damit Protokollzeilen in Vormerk-Reihenfolge landen –
+        Notiz-Diffs beziehen sich auf die jeweils vorherige Zeile.
+        """
+        with self._db_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+                events, self._events = self._events, []
+            if not pending and not events:
+                return
+            now = time.time()
+            try:
+                self._conn.execute('BEGIN')
+                try:
+                    for (survey_hash, session_id), entry in pending.items():
+                        self._conn.execute(
+                            "INSERT INTO review_sessions VALUES (?, ?, ?, ?, ?) "
+                            "ON CONFLICT (survey_hash, session_id) "
+                            "DO UPDATE SET meta = excluded.meta, updated = excluded.updated",
+                            (survey_hash, session_id, json.dumps(entry['meta']), now, now)
+                        )
+                        self._conn.executemany(
+                            "INSERT INTO review_pairs VALUES (?, ?, ?, ?, ?, ?, ?) "
+                            "ON CONFLICT (survey_hash, session_id, gene, disease) "
+                            "DO UPDATE SET decision = excluded.decision, note = excluded.note, "
+                            "updated = excluded.updated",
+                            [(survey_hash, session_id, gene, disease, decision, note, now)
+                             for (gene, disease), (decision, note) in entry['pairs'].items()]
+                        )
+                    event_rows, logged = self._encode_events(events)
+                    self._conn.executemany(
+                        "INSERT INTO review_events VALUES (?, ?, ?, ?, ?, ?, ?, ?)", event_rows)
+                    self._conn.execute('COMMIT')
+                except BaseException:
+                    self._conn.execute('ROLLBACK')
+                    raise
+                self._logged.update(logged)
+                self.last_error = None
+            except sqlite3.Error as e:
+                # Nicht geschriebene Änderungen zurücklegen (neuere haben Vorrang,
+                # Protokollzeilen bleiben vor den inzwischen vorgemerkten)
+                with self._pending_lock:
+                    for session_key, entry in pending.items():
+                        newer = self._pending.get(session_key)
+                        if newer is not None:
+                            entry['meta'] = newer['meta']
+                            entry['pairs'].update(newer['pairs'])
+                        self._pending[session_key] = entry
+                    self._events[:0] = events
+                self.last_error = str(e)
+
+    def _last_logged(self, survey_hash, session_id, key, field, logged):
+        """Zuletzt protokollierter Notiztext bzw. Anwesende (aus dem Protokoll beim ersten Zugriff)."""
+        logged_key = (survey_hash, session_id, key, field)
+        if logged_key in logged:
+            return logged[logged_key]
+        if logged_key not in self._logged:
+            gene, disease = key if key is not None else (None, None)
+            rows = self._conn.execute(
+                "SELECT ts, author, gene, disease, field, value FROM review_events "
+                "WHERE survey_hash = ? AND session_id = ? AND field = ? "
+                "AND gene IS ? AND disease IS ? ORDER BY rowid",
+                (survey_hash, session_id, field, gene, disease)
+            ).fetchall()
+            _, notes, attendees = replay_review_events(rows)
+            self._logged[logged_key] = attendees if field == 'attendees' else notes.get(key, '')
+        return self._logged[logged_key]
+
+    def _encode_events(self, events):
+        """Protokollzeilen der vorgemerkten Änderungen; unveränderte Werte entfallen."""
+        rows, logged = [], {}
+        for ts, survey_hash, session_id, author, key, field, old, new in events:
+            if field == 'decision':
+                if old == new:
+                    continue
+                value = [old, new]
             else:
-                continue
+                last = self._last_logged(survey_hash, session_id, key, field, logged)
+                if last == new:
+                    continue
+                value = note_diff(last, new) if field == 'note' else new
+                logged[(survey_hash, session_id, key, field)] = new
+            gene, disease = key if key is not None else (None, None)
+            rows.append((survey_hash, session_id, ts, author, gene, disease, field,
+                         json.dumps(value, ensure_ascii=False, separators=(',', ':'))))
+        return rows, logged
+
+    def list_sessions(self, limit=SESSION_LIST_LIMIT):
+        """Zuletzt bearbeitete Sitzungen: Liste von (survey_hash, session_id, meta, updated, Anzahl Paare)."""
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT s.survey_hash, s.session_id, s.meta, s.updated, COUNT(p.gene) "
+                "FROM review_sessions s LEFT JOIN review_pairs p USING (survey_hash, session_id) "
+                "GROUP BY s.survey_hash, s.session_id ORDER BY s.updated DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [(survey_hash, session_id, json.loads(meta), updated, n_pairs)
+                for survey_hash, session_id, meta, updated, n_pairs in rows]
+
+    def load(self, survey_hash, session_id):
+        """
+        Stand einer Sitzung in einer Abfrage: (meta, decisions, notes) mit
+        (gene, disease) Tupeln als Keys, oder None, wenn es sie nicht gibt.
+        """
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT s.meta, p.gene, p.disease, p.decision, p.note "
+                "FROM review_sessions s LEFT JOIN review_pairs p USING (survey_hash, session_id) "
+                "WHERE s.survey_hash = ? AND s.session_id = ?",
+                (survey_hash, session_id)
+            ).fetchall()
+        if not rows:
+            return None
+        decisions, notes = {}, {}
+        for _, gene, disease, decision, note in rows:
+            if gene is not None:
+                decisions[(gene, disease)] = decision
+                notes[(gene, disease)] = note
+        return json.loads(rows[0][0]), decisions, notes
+
+    def events(self, survey_hash, session_id):
+        """Protokollzeilen (ts, author, gene, disease, field, value) einer Sitzung in Schreibreihenfolge."""
+        self.flush()
+        with self._db_lock:
+            return self._conn.execute(
+                "SELECT ts, author, gene, disease, field, value FROM review_events "
+                "WHERE survey_hash = ? AND session_id = ? ORDER BY rowid",
+                (survey_hash, session_id)
+            ).fetchall()
+
+
+@st.cache_resource
+def get_session_store():
+    """Einzige ReviewSessionStore-Instanz pro Prozess (None = abgeschaltet/nicht verfügbar)."""
+    if not SESSION_DB_PATH:
+        return None
+    try:
+        return ReviewSessionStore(SESSION_DB_PATH)
+    except (OSError, sqlite3.Error):
+        return None
 
-            if priority < best_priority:
-                best_priority = priority
-                best_match = wiss_cols
-
-        gene_col_index[(nat_gene, nat_disease)] = {
-            'nat_q':    [nat_entries[(nat_gene, nat_disease)]['q']]
-                        if nat_entries[(nat_gene, nat_disease)]['q'] else [],
-            'nat_kom':  [nat_entries[(nat_gene, nat_disease)]['kom']]
-                        if nat_entries[(nat_gene, nat_disease)]['kom'] else [],
-            'wiss_q':   [best_match['q']]   if best_match and best_match['q']   else [],
-            'wiss_kom': [best_match['kom']]  if best_match and best_match['kom'] else [],
-        }
 
-    gene_pairs = nat_order  # geordnete Liste von (gene, disease) Tupeln
-    return gene_col_index, gene_pairs
+def autosave_session(keys=()):
+    """
+    Merkt den aktuellen Sitzungsstand zum Speichern vor: Metadaten und die
+    Entscheidung/Notiz der übergebenen (gene, disease) Paare.
+    """
+    store = get_session_store()
+    if store is None or not st.session_state.get('review_session_id'):
+        return
+    meta = {name: st.session_state.get(name) for name in SESSION_META_KEYS}
+    pairs = {key: (st.session_state.gene_decisions.get(key, NOT_RATED),
+                   st.session_state.user_comments.get(key, ''))
+             for key in keys}
+    store.save(st.session_state.survey_hash, st.session_state.review_session_id, meta, pairs)
+
+
+def log_review_event(key, field, old, new):
+    """Hängt eine Änderung der aktuellen Sitzung an das Protokoll an (ReviewSessionStore.log_event)."""
+    store = get_session_store()
+    if store is None or not st.session_state.get('review_session_id'):
+        return
+    store.log_event(st.session_state.survey_hash, st.session_state.review_session_id,
+                    reviewer_label(), key, field, old, new)
+
+
+def attendee_names():
+    """Anwesende mit vollem Namen (Auswahl + weitere Teilnehmer)."""
+    names = [(reference_data['attendees_list'] or {}).get(a, a) for a in st.session_state.selected_attendees]
+    additional = st.session_state.get('additional_attendees') or ''
+    names.extend(n.strip() for n in additional.split(',') if n.strip())
+    return names
+
+
+def format_saved_session(session):
+    """Anzeigetext einer gespeicherten Sitzung für die Auswahl beim Upload."""
+    survey_hash, session_id, meta, updated, n_pairs = session
+    shared = get_shared_sessions().get(survey_hash, session_id)
+    viewers = shared.active_viewers() if shared is not None else 0
+    return (f"{meta.get('survey_name') or 'Umfrage'} · "
+            f"{meta.get('selected_disease_group') or 'ohne Erkrankungsgruppe'} · "
+            f"{n_pairs} Kombinationen bearbeitet · "
+            f"{datetime.fromtimestamp(updated).strftime('%d.%m.%Y %H:%M')}"
+            f"{f' · 👥 {viewers} aktiv' if viewers else ''}")
 
 
-def gd_key(gene, disease):
-    """Kurzform für den zusammengesetzten Schlüssel."""
-    return (gene, disease)
+# ---------------------------------------------------------------------------
+# Geteilte Review-Sitzungen (mehrere Browser, gleiche Sitzung)
+# ---------------------------------------------------------------------------
+
+SHARED_POLL_SECONDS = 2            # Abfrageintervall der Browser-Sessions
+SHARED_VIEWER_TIMEOUT = 30         # Sekunden ohne Abfrage -> nicht mehr verbunden
+SHARED_SESSION_IDLE = 6 * 60 * 60  # Sekunden, danach fällt die Sitzung aus dem Speicher
+SHARED_TRAIL_LENGTH = 200          # Einträge im Änderungsverlauf
+
+
+class SharedReviewSession:
+    """
+    Gemeinsamer Stand einer Review-Sitzung für alle Browser-Sessions, die
+    dieselbe (survey_hash, session_id) geöffnet haben.
+
+    Gehalten werden nur im Review geänderte Werte pro Paar und Feld
+    ('decision', 'note'). Jede Änderung erhöht die Version; Sessions holen
+    mit changes_since() nur die Paare, die sich seit ihrer letzten Version
+    geändert haben. Konflikte: last-writer-wins pro Feld, im Verlauf
+    markiert, wenn der Wert seit dem letzten Abgleich des Schreibenden von
+    jemand anderem geändert wurde.
+    """
+
+    def __init__(self, decisions=None, notes=None):
+        self._lock = threading.Lock()
+        self.values = {}              # key -> {'decision': ..., 'note': ...}
+        for field, values in (('decision', decisions or {}), ('note', notes or {})):
+            for key, value in values.items():
+                self.values.setdefault(key, {})[field] = value
+        self.version = 0
+        self._key_versions = {}       # key -> Version der letzten Änderung, aufsteigend eingefügt
+        self._field_versions = {}     # (key, field) -> Version der letzten Änderung
+        self.trail = collections.deque(maxlen=SHARED_TRAIL_LENGTH)
+        self._viewers = {}            # viewer_id -> letzte Abfrage (monotonic)
+        self.last_activity = time.monotonic()
+
+    def apply(self, key, field, value, base_version, author, old=None):
+        """
+        Setzt ein Feld eines Paares (last-writer-wins) und gibt den bisherigen
+        gemeinsamen Wert zurück. old: bisheriger Wert der Browser-Session,
+        falls das Feld hier noch nicht geändert wurde (z. B. die
+        Umfrage-Empfehlung).
+        """
+        with self._lock:
+            old = self.values.get(key, {}).get(field, old)
+            if old == value:
+                return old
+            self.version += 1
+            self.values.setdefault(key, {})[field] = value
+            conflict = self._field_versions.get((key, field), 0) > base_version
+            self._field_versions[(key, field)] = self.version
+            # Neu einfügen hält die Reihenfolge aufsteigend nach Version und
+            # begrenzt den Index auf einen Eintrag pro Paar
+            self._key_versions.pop(key, None)
+            self._key_versions[key] = self.version
+            self.trail.append({
+                'time': datetime.now(), 'author': author, 'key': key, 'field': field,
+                'old': old, 'new': value, 'conflict': conflict,
+            })
+            self.last_activity = time.monotonic()
+            return old
+
+    def changes_since(self, version):
+        """(aktuelle Version, {key: {'decision'/'note': Wert}}) aller seit version geänderten Paare."""
+        with self._lock:
+            if version >= self.version:
+                return self.version, {}
+            changes = {}
+            for key, changed in reversed(self._key_versions.items()):
+                if changed <= version:
+                    break
+                changes[key] = dict(self.values[key])
+            return self.version, changes
+
+    def touch(self, viewer_id):
+        """
+        Markiert eine Browser-Session als verbunden; gibt die Anzahl verbundener
+        zurück. Sessions ohne Abfrage seit SHARED_VIEWER_TIMEOUT werden entfernt.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._viewers = {viewer: seen for viewer, seen in self._viewers.items()
+                             if now - seen < SHARED_VIEWER_TIMEOUT}
+            self._viewers[viewer_id] = now
+            self.last_activity = now
+            return len(self._viewers)
+
+    def active_viewers(self):
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for seen in self._viewers.values() if now - seen < SHARED_VIEWER_TIMEOUT)
+
+
+class SharedSessionRegistry:
+    """Prozessweites Verzeichnis der geteilten Sitzungen, Schlüssel (survey_hash, session_id)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def get(self, survey_hash, session_id):
+        with self._lock:
+            return self._sessions.get((survey_hash, session_id))
+
+    def get_or_create(self, survey_hash, session_id, decisions=None, notes=None):
+        """
+        Bestehende Sitzung oder neue mit dem übergebenen (gespeicherten) Stand.
+        Lange unbenutzte Sitzungen werden dabei verworfen; sie liegen im
+        ReviewSessionStore.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for session_key, shared in list(self._sessions.items()):
+                if now - shared.last_activity > SHARED_SESSION_IDLE:
+                    del self._sessions[session_key]
+            shared = self._sessions.get((survey_hash, session_id))
+            if shared is None:
+                shared = self._sessions[(survey_hash, session_id)] = SharedReviewSession(decisions, notes)
+            return shared
+
+
+@st.cache_resource
+def get_shared_sessions():
+    """Einzige SharedSessionRegistry-Instanz pro Prozess."""
+    return SharedSessionRegistry()
+
+
+def current_shared_session():
+    """Geteilte Sitzung der aktuellen Browser-Session (None vor dem Upload)."""
+    if not st.session_state.get('review_session_id'):
+        return None
+    return get_shared_sessions().get(st.session_state.survey_hash, st.session_state.review_session_id)
+
+
+def reviewer_label():
+    """Name im Änderungsverlauf: Eingabe in der Sidebar oder Kurz-ID der Browser-Session."""
+    name = (st.session_state.get('reviewer_name') or '').strip()
+    return name or f"Sitzung {st.session_state.viewer_id[:4]}"
+
+
+def sync_shared_state():
+    """
+    Übernimmt Änderungen anderer Browser-Sessions seit dem letzten Abgleich in
+    gene_decisions/user_comments und in die Widgets der betroffenen Paare.
+    Ungespeicherte Notiz-Entwürfe im Textfeld bleiben erhalten. Muss vor dem
+    Rendern der Widgets laufen; gibt True zurück, wenn sich etwas geändert hat.
+    """
+    shared = current_shared_session()
+    if shared is None:
+        return False
+    version, changes = shared.changes_since(st.session_state.shared_version)
+    st.session_state.shared_version = version
+    if not changes:
+        return False
+    pair_index = {pair: pair_idx for pair_idx, pair in enumerate(st.session_state.gene_pairs)}
+    for key, values in changes.items():
+        if key not in pair_index:
+            continue
+        gene, disease = key
+        pair_idx = pair_index[key]
+        # Veraltete Widget-Werte verwerfen: die Widgets starten dann mit dem
+        # übernommenen Stand (index/value aus gene_decisions/user_comments)
+        if 'decision' in values:
+            st.session_state.gene_decisions[key] = values['decision']
+            decision_key = f'decision_{gene}_{disease}_{pair_idx}'
+            if st.session_state.get(decision_key, values['decision']) != values['decision']:
+                del st.session_state[decision_key]
+        if 'note' in values:
+            comment_key = f'comment_input_{gene}_{disease}_{pair_idx}'
+            saved_note = st.session_state.user_comments.get(key, '')
+            if st.session_state.get(comment_key, saved_note) == saved_note != values['note']:
+                st.session_state.pop(comment_key, None)
+            st.session_state.user_comments[key] = values['note']
+    return True
+
+
+def record_pair_change(key, field, value, old=None):
+    """
+    Änderung eines Paares aus einem Widget-Callback: in die geteilte Sitzung
+    schreiben, Änderungen der anderen übernehmen, protokollieren und
+    Autosave vormerken. Unveränderte Werte lösen nichts aus.
+    """
+    shared = current_shared_session()
+    if shared is not None:
+        old = shared.apply(key, field, value, st.session_state.shared_version, reviewer_label(), old)
+        sync_shared_state()
+    if old == value:
+        return
+    log_review_event(key, field, old, value)
+    autosave_session((key,))
+
+
+@st.fragment(run_every=SHARED_POLL_SECONDS)
+def shared_session_watcher():
+    """
+    Prüft alle SHARED_POLL_SECONDS Sekunden (nur ein Versionsvergleich), ob
+    andere Browser-Sessions etwas geändert haben, und rendert dann neu.
+    Zeigt die Anzahl verbundener Browser-Sessions.
+    """
+    shared = current_shared_session()
+    if shared is None:
+        return
+    viewers = shared.touch(st.session_state.viewer_id)
+    if viewers > 1:
+        st.caption(f"👥 {viewers} Browser-Sitzungen verbunden")
+    if shared.version != st.session_state.shared_version:
+        st.rerun()
+
+
+def format_trail_entry(entry):
+    """Eine Zeile des Änderungsverlaufs für die Sidebar."""
+    gene, disease = entry['key']
+    disease_short = disease[:25] + '…' if len(disease) > 25 else disease
+    if entry['field'] == 'decision':
+        change = f"{entry['old'] or NOT_RATED} → {entry['new']}"
+    else:
+        change = f"Notiz {'gelöscht' if not entry['new'] else 'geändert'}"
+    conflict = ' ⚠️ überschrieben' if entry['conflict'] else ''
+    return f"{entry['time'].strftime('%H:%M:%S')} · {entry['author']} · *{gene}* – {disease_short}: {change}{conflict}"
 
 
 # ---------------------------------------------------------------------------
@@ -296,17 +1356,9 @@ div[data-baseweb="select"] > div { cursor: pointer !important; }
 </style>
 
 <script>
-function navigateTab(direction) {
-    const tabs = document.querySelectorAll('[data-baseweb="tab"]');
-    if (tabs.length === 0) return;
-    let activeIndex = -1;
-    tabs.forEach((tab, index) => {
-        if (tab.getAttribute('aria-selected') === 'true') activeIndex = index;
-    });
-    if (activeIndex === -1) return;
-    const nextIndex = (activeIndex + direction + tabs.length) % tabs.length;
-    tabs[nextIndex].click();
-    tabs[nextIndex].scrollIntoView({ behavior: 'smooth', block: 'nearest', inline: 'center' });
+function navigatePair(direction) {
+    const btn = document.querySelector(direction < 0 ? '.st-key-pair_prev button' : '.st-key-pair_next button');
+    if (btn) btn.click();
 }
 
 function resizeTabs() {
@@ -342,22 +1394,13 @@ observer.observe(document.body, { childList: true, subtree: true });
 
 document.addEventListener('keydown', function(e) {
     if (e.target.tagName === 'INPUT' || e.target.tagName === 'TEXTAREA') return;
-    const tabs = document.querySelectorAll('[data-baseweb="tab"]');
-    if (tabs.length === 0) return;
-    let activeIndex = -1;
-    tabs.forEach((tab, index) => {
-        if (tab.getAttribute('aria-selected') === 'true') activeIndex = index;
-    });
-    if (activeIndex === -1) return;
     if (e.key === 'ArrowRight') {
         e.preventDefault();
-        const nextIndex = (activeIndex + 1) % tabs.length;
-        tabs[nextIndex].click();
+        navigatePair(1);
     }
     if (e.key === 'ArrowLeft') {
         e.preventDefault();
-        const prevIndex = (activeIndex - 1 + tabs.length) % tabs.length;
-        tabs[prevIndex].click();
+        navigatePair(-1);
     }
 });
 </script>
@@ -366,206 +1409,156 @@ document.addEventListener('keydown', function(e) {
 st.markdown("# Expertenreview gNBS")
 
 # Session State
-if 'df' not in st.session_state: st.session_state.df = None
+# Bereinigte Kommentare pro (gene, disease) Paar (build_comment_store)
+if 'comment_store' not in st.session_state: st.session_state.comment_store = {}
 # PATCH: gene_pairs ist jetzt eine Liste von (gene, disease) Tupeln
 if 'gene_pairs' not in st.session_state: st.session_state.gene_pairs = []
 # PATCH: gene_col_index ersetzt gene_dict für Spalten-Lookups
 if 'gene_col_index' not in st.session_state: st.session_state.gene_col_index = {}
 # Kompatibilität: gene_dict bleibt für Erkrankungsanzeige (gene, disease) -> disease
 if 'gene_dict' not in st.session_state: st.session_state.gene_dict = {}
+# Klassifizierte Spaltenheader (parse_headers), wiederverwendbar ohne Neu-Scan
+if 'header_table' not in st.session_state: st.session_state.header_table = None
+# Übersichtstabelle pro Paar (None = noch keine CSV geladen)
 if 'summary_df' not in st.session_state: st.session_state.summary_df = None
+# SHA-256 der hochgeladenen CSV (Cache-Schlüssel)
+if 'survey_hash' not in st.session_state: st.session_state.survey_hash = None
+# Encoding, Parser-Engine und Dauer des CSV-Imports
+if 'parse_info' not in st.session_state: st.session_state.parse_info = None
+# Antwortzähler pro (gene, disease) Paar, einmalig beim Import berechnet
+if 'answer_counts' not in st.session_state: st.session_state.answer_counts = None
 if 'total_responses' not in st.session_state: st.session_state.total_responses = 0
 # PATCH: Schlüssel in user_comments und gene_decisions sind jetzt (gene, disease) Tupel
 if 'user_comments' not in st.session_state: st.session_state.user_comments = {}
 if 'gene_decisions' not in st.session_state: st.session_state.gene_decisions = {}
 if 'review_started' not in st.session_state: st.session_state.review_started = False
-if 'nbs_overlap' not in st.session_state: st.session_state.nbs_overlap = None
-if 'prospective_studies' not in st.session_state: st.session_state.prospective_studies = None
-if 'attendees_list' not in st.session_state: st.session_state.attendees_list = None
+# Index der aktuell angezeigten (gene, disease) Kombination im Review
+if 'current_pair_idx' not in st.session_state: st.session_state.current_pair_idx = 0
 if 'selected_attendees' not in st.session_state: st.session_state.selected_attendees = []
-if 'disease_groups_list' not in st.session_state: st.session_state.disease_groups_list = None
 if 'selected_disease_group' not in st.session_state: st.session_state.selected_disease_group = None
-
-# Lade Namen/Kürzel beim ersten Start
-if st.session_state.attendees_list is None:
-    try:
-        import urllib.request
-        names_url = "https://raw.githubusercontent.com/HeikoBre/screening-dashboard-sandbox/main/docs/names.csv"
-        response = urllib.request.urlopen(names_url)
-        names_content = response.read().decode('utf-8-sig')
-        names_df = pd.read_csv(io.StringIO(names_content))
-        st.session_state.attendees_list = dict(zip(names_df['Name'], names_df['Kürzel']))
-    except Exception as e:
-        st.session_state.attendees_list = {}
-
-# Lade Erkrankungsgruppen beim ersten Start
-if st.session_state.disease_groups_list is None:
-    try:
-        import urllib.request
-        groups_url = "https://raw.githubusercontent.com/HeikoBre/screening-dashboard-sandbox/main/docs/disease_groups.csv"
-        response = urllib.request.urlopen(groups_url)
-        groups_content = response.read().decode('utf-8-sig')
-        groups_df = pd.read_csv(io.StringIO(groups_content))
-        st.session_state.disease_groups_list = groups_df['Gruppe'].dropna().tolist()
-    except Exception as e:
-        st.session_state.disease_groups_list = [
-            'Metabolisch', 'Renal', 'Kardiovaskulär', 'Hämatologisch',
-            'Immunologisch', 'Neurologisch', 'Endokrinologisch',
-            'Muskuloskelettal', 'Sonstige'
-        ]
-
-# Lade NBS/NGS2025 Overlap-Daten beim ersten Start
-if st.session_state.nbs_overlap is None:
-    try:
-        import urllib.request
-        overlap_url = "https://raw.githubusercontent.com/HeikoBre/screening-dashboard-sandbox/main/docs/Overlap_annotated_NBS.csv"
-        response = urllib.request.urlopen(overlap_url)
-        overlap_content = response.read().decode('utf-8-sig')
-        overlap_df = pd.read_csv(io.StringIO(overlap_content), sep=';')
-        st.session_state.nbs_overlap = dict(zip(overlap_df['Gene'], overlap_df['Group']))
-    except Exception as e:
-        st.session_state.nbs_overlap = {}
-
-# Lade Prospective Studies Excel beim ersten Start
-if st.session_state.prospective_studies is None:
-    try:
-        import urllib.request
-        studies_url = "https://raw.githubusercontent.com/HeikoBre/screening-dashboard-sandbox/main/docs/Prospective_studies.xlsx"
-        response = urllib.request.urlopen(studies_url)
-        excel_data = io.BytesIO(response.read())
-        babyscreen_df = pd.read_excel(excel_data, sheet_name='BabyScreen+', engine='openpyxl')
-        excel_data.seek(0)
-        guardian_df = pd.read_excel(excel_data, sheet_name='Guardian', engine='openpyxl')
-        excel_data.seek(0)
-        generation_df = pd.read_excel(excel_data, sheet_name='Generation Study', engine='openpyxl')
-        try:
-            excel_data.seek(0)
-            beacons_df = pd.read_excel(excel_data, sheet_name='Beacons', engine='openpyxl')
-            beacons_dict = dict(zip(beacons_df['Gene'].astype(str), beacons_df['Disorder'].astype(str)))
-        except:
-            beacons_dict = {}
-        st.session_state.prospective_studies = {
-            'BabyScreen+': dict(zip(babyscreen_df['Gene'].astype(str), babyscreen_df['Disorder'].astype(str))),
-            'Guardian': dict(zip(guardian_df['Gene'].astype(str), guardian_df['Disorder'].astype(str))),
-            'Generation Study': dict(zip(generation_df['Gene'].astype(str), generation_df['Disorder'].astype(str))),
-            'Beacons': beacons_dict
-        }
-        st.session_state.prospective_studies_error = None
-    except Exception as e:
-        st.session_state.prospective_studies = {
-            'BabyScreen+': {}, 'Guardian': {}, 'Generation Study': {}, 'Beacons': {}
-        }
-        st.session_state.prospective_studies_error = str(e)
+# Zuletzt gebaute Exporte: (export_state_key, bytes)
+if 'pdf_cache' not in st.session_state: st.session_state.pdf_cache = None
+if 'csv_cache' not in st.session_state: st.session_state.csv_cache = None
+# PDF-Flowables pro (gene, disease) Paar: key -> (Eingabe-Schlüssel, Flowables)
+if 'pdf_fragments' not in st.session_state: st.session_state.pdf_fragments = {}
+# Paralleler PDF-Export: Hash der Block-Eingaben -> (Bytes, Seiten, Anker-Seiten)
+if 'pdf_chunks' not in st.session_state: st.session_state.pdf_chunks = {}
+# Ungespeicherte Notiz-Entwürfe pro (gene, disease) Paar beim Wechsel der Kombination
+if 'note_drafts' not in st.session_state: st.session_state.note_drafts = {}
+# Persistente Sitzung (ReviewSessionStore): ID und Dateiname der Umfrage
+if 'review_session_id' not in st.session_state: st.session_state.review_session_id = None
+if 'survey_name' not in st.session_state: st.session_state.survey_name = None
+# Geteilte Sitzung (SharedReviewSession): zuletzt übernommene Version, ID
+# dieser Browser-Session und Name im Änderungsverlauf
+if 'shared_version' not in st.session_state: st.session_state.shared_version = 0
+if 'viewer_id' not in st.session_state: st.session_state.viewer_id = uuid.uuid4().hex
+if 'reviewer_name' not in st.session_state: st.session_state.reviewer_name = ''
+
+# Änderungen anderer Browser-Sessions übernehmen, bevor Widgets gerendert werden
+sync_shared_state()
+
+# Referenzdaten aus dem prozessweiten Cache – das Upload-Widget wird sofort
+# gerendert, abhängige Anzeigen (Badges, Studien) füllen sich, sobald die
+# Loads fertig sind
+reference_data, reference_errors, reference_pending = read_reference_data()
+if reference_pending:
+    reference_data_watcher(tuple(reference_pending))
+
+ref_local, ref_remote = st.sidebar.columns(2)
+if ref_local.button('🔄 Referenzdaten', use_container_width=True,
+                    help='Teilnehmer, Erkrankungsgruppen, NBS-Overlap und Studien für alle Sessions neu laden'):
+    get_reference_cache().invalidate()
+    st.rerun()
+if ref_remote.button('🌐 Aus Repository', use_container_width=True,
+                     help='Referenzdaten für alle Sessions aus dem GitHub-Repository aktualisieren'):
+    get_reference_cache().invalidate(source='remote')
+    st.rerun()
+for name, error in reference_errors.items():
+    st.sidebar.caption(f"⚠️ {name}: {error}")
+session_store = get_session_store()
+if session_store is not None and session_store.last_error:
+    st.sidebar.caption(f"⚠️ Autosave: {session_store.last_error}")
+shared_session = current_shared_session()
+if shared_session is not None:
+    with st.sidebar:
+        st.text_input('Name im Änderungsverlauf', key='reviewer_name',
+                      placeholder=f"Sitzung {st.session_state.viewer_id[:4]}",
+                      help='Wird bei Änderungen in geteilten Sitzungen angezeigt')
+        shared_session_watcher()
+        if shared_session.trail:
+            with st.expander(f"🕓 Änderungsverlauf ({len(shared_session.trail)})"):
+                for entry in reversed(shared_session.trail):
+                    st.caption(format_trail_entry(entry))
+st.sidebar.caption(f"Version {APP_VERSION_LABEL} · [Repository]({GITHUB_REPO})")
 
 # Upload
-if st.session_state.df is None:
+if st.session_state.summary_df is None:
     uploaded_file = st.file_uploader('CSV hochladen', type='csv')
 
     st.markdown("---")
     st.markdown("#### 🧪 Testmodus")
     st.markdown("<small style='color:#888;'>Zum Testen der App können Dummy-Datensätze aus dem Repository geladen werden:</small>", unsafe_allow_html=True)
 
-    DUMMY_BASE = "https://raw.githubusercontent.com/HeikoBre/screening-dashboard-sandbox/main/docs"
-
     col_d1, col_d2 = st.columns(2)
     with col_d1:
         if st.button("📂 8 Antworten (ohne Kommentare)", use_container_width=True):
-            import urllib.request
-            url = f"{DUMMY_BASE}/dummy_survey_data.csv"
             with st.spinner("Lade Dummy-Daten..."):
                 try:
-                    response = urllib.request.urlopen(url)
-                    uploaded_file = io.BytesIO(response.read())
+                    uploaded_file = io.BytesIO(fetch_reference_file('dummy_survey_data.csv'))
                     uploaded_file.name = "dummy_survey_data.csv"
                 except Exception as e:
                     st.error(f"Konnte Dummy-Daten nicht laden: {e}")
                     uploaded_file = None
     with col_d2:
         if st.button("📂 20 Antworten (mit Kommentaren)", use_container_width=True):
-            import urllib.request
-            url = f"{DUMMY_BASE}/dummy_survey_20.csv"
             with st.spinner("Lade Dummy-Daten..."):
                 try:
-                    response = urllib.request.urlopen(url)
-                    uploaded_file = io.BytesIO(response.read())
+                    uploaded_file = io.BytesIO(fetch_reference_file('dummy_survey_20.csv'))
                     uploaded_file.name = "dummy_survey_20.csv"
                 except Exception as e:
                     st.error(f"Konnte Dummy-Daten nicht laden: {e}")
                     uploaded_file = None
 
+    # Gespeicherte Sitzungen: Auswahl + erneuter Upload derselben CSV setzt
+    # Entscheidungen, Notizen, Teilnehmer und Erkrankungsgruppe fort
+    saved_sessions = {(session[0], session[1]): session
+                      for session in (session_store.list_sessions() if session_store is not None else [])}
+    resume_session = None
+    if saved_sessions:
+        st.markdown("---")
+        st.markdown("#### 🔄 Sitzung fortsetzen")
+        st.markdown("<small style='color:#888;'>Gespeicherte Sitzung auswählen und anschließend die zugehörige CSV hochladen:</small>", unsafe_allow_html=True)
+        resume_session = st.selectbox(
+            "Gespeicherte Sitzung", options=[None] + list(saved_sessions),
+            format_func=lambda session_key: ('– neue Sitzung –' if session_key is None
+                                             else format_saved_session(saved_sessions[session_key])),
+            label_visibility="collapsed", key="resume_session"
+        )
+
     if uploaded_file is not None:
+        file_bytes = uploaded_file.getvalue()
+        file_hash  = hashlib.sha256(file_bytes).hexdigest()
+        restored = None
+        if resume_session is not None:
+            if resume_session[0] != file_hash:
+                st.error("Die hochgeladene CSV gehört nicht zur gewählten Sitzung.")
+                st.stop()
+            restored = session_store.load(*resume_session)
+
         with st.spinner('Lade & analysiere...'):
-            try:
-                df = pd.read_csv(uploaded_file, sep=',', quotechar='"', encoding='utf-8-sig',
-                               engine='python')
-            except:
-                uploaded_file.seek(0)
-                try:
-                    df = pd.read_csv(uploaded_file, sep=',', quotechar='"', encoding='utf-8',
-                                   engine='python')
-                except:
-                    uploaded_file.seek(0)
-                    try:
-                        df = pd.read_csv(uploaded_file, sep=',', quotechar='"', encoding='latin-1',
-                                       engine='python')
-                    except:
-                        uploaded_file.seek(0)
-                        df = pd.read_csv(uploaded_file, sep=',', quotechar='"', encoding='utf-8-sig')
-
-            st.session_state.df = df
-            st.session_state.total_responses = len(df)
-
-            # PATCH: zentrales Parsing über build_gene_col_index()
-            gene_col_index, gene_pairs = build_gene_col_index(df)
-            st.session_state.gene_col_index = gene_col_index
-            st.session_state.gene_pairs = gene_pairs
+            survey = load_survey(file_hash, file_bytes)
+            if not survey['gene_pairs']:
+                st.error("In der CSV wurden keine Gen-Erkrankungs-Kombinationen gefunden. "
+                         "Bitte prüfen, ob es sich um einen LimeSurvey-Export der gNBS-Umfrage handelt.")
+                st.stop()
+            for name, value in survey.items():
+                st.session_state[name] = value
+
+            gene_pairs = survey['gene_pairs']
+            st.session_state.survey_hash = file_hash
             # gene_dict: (gene, disease) -> disease (für Erkrankungsanzeige)
             st.session_state.gene_dict = {(g, d): d for (g, d) in gene_pairs}
 
-            # summary_df aufbauen – Schlüssel ist jetzt (gene, disease)
-            summary_data = []
-            for (gene, disease) in gene_pairs:
-                cols = gene_col_index[(gene, disease)]
-                nat_data  = df[cols['nat_q']].stack().dropna()  if cols['nat_q']  else pd.Series(dtype=str)
-                stud_data = df[cols['wiss_q']].stack().dropna() if cols['wiss_q'] else pd.Series(dtype=str)
-
-                n_nat  = len(nat_data)
-                n_stud = len(stud_data)
-
-                nat_ja   = (nat_data  == 'Ja').sum() / n_nat  * 100 if n_nat  > 0 else 0
-                stud_ja  = (stud_data == 'Ja').sum() / n_stud * 100 if n_stud > 0 else 0
-
-                nat_comments = [
-                    str(c).replace('\r\n', ' ').replace('\r', ' ').replace('\n', ' ').strip()
-                    for c in df[cols['nat_kom']].stack().dropna() if str(c).strip()
-                ] if cols['nat_kom'] else []
-
-                stud_comments = [
-                    str(c).replace('\r\n', ' ').replace('\r', ' ').replace('\n', ' ').strip()
-                    for c in df[cols['wiss_kom']].stack().dropna() if str(c).strip()
-                ] if cols['wiss_kom'] else []
-
-                # PATCH: Warnung wenn wiss-Spalten fehlen
-                wiss_missing = len(cols['wiss_q']) == 0
-
-                disease_display = disease[:1].upper() + disease[1:] if disease else ''
-                summary_data.append({
-                    'Gen': gene,
-                    'Erkrankung': disease_display,
-                    # PATCH: Gene-Disease-Key als Tuple gespeichert für spätere Lookups
-                    '_key': (gene, disease),
-                    'National_Ja_pct': round(nat_ja, 1),
-                    'National_n': n_nat,
-                    'Studie_Ja_pct': round(stud_ja, 1),
-                    'Studie_n': n_stud,
-                    'National_80': 'Yes' if nat_ja >= 80 else 'No',
-                    'Kommentare_National': ' | '.join(nat_comments) if nat_comments else '',
-                    'Kommentare_Studie':   ' | '.join(stud_comments) if stud_comments else '',
-                    'Wiss_fehlend': wiss_missing,
-                })
-
-            st.session_state.summary_df = pd.DataFrame(summary_data)
-
             # Warnungen für fehlende wiss-Spalten (BCL11/CD79A-Typ-Fehler)
             missing = st.session_state.summary_df[st.session_state.summary_df['Wiss_fehlend']]
             if not missing.empty:
@@ -576,17 +1569,36 @@ if st.session_state.df is None:
                     f"Bitte Gennamen in LimeSurvey auf Konsistenz prüfen."
                 )
 
-            # Initiale Entscheidungen setzen
-            if not st.session_state.gene_decisions:
-                for (gene, disease) in gene_pairs:
-                    row = st.session_state.summary_df[st.session_state.summary_df['_key'] == (gene, disease)].iloc[0]
-                    key = (gene, disease)
-                    if row['National_Ja_pct'] >= 80:
-                        st.session_state.gene_decisions[key] = '🟢 Aufnahme in nationales gNBS'
-                    elif row['Studie_Ja_pct'] >= 80:
-                        st.session_state.gene_decisions[key] = '🟡 Aufnahme in wissenschaftliche gNBS Studie'
-                    else:
-                        st.session_state.gene_decisions[key] = '🔴 Keine Berücksichtigung im gNBS'
+            # Initiale Entscheidungen setzen (= Umfrage-Empfehlung)
+            if not st.session_state.gene_decisions and not survey['summary_df'].empty:
+                initial = [f'{RECOMMENDATION_EMOJI[c]} {RECOMMENDATION_LABELS[c]}'
+                           for c in range(len(RECOMMENDATION_LABELS))]
+                codes = survey['summary_df']['Umfrage_Empfehlung'].cat.codes.to_numpy()
+                st.session_state.gene_decisions = dict(zip(
+                    survey['summary_df']['_key'], np.array(initial, dtype=object)[codes]
+                ))
+
+            st.session_state.survey_name = getattr(uploaded_file, 'name', None)
+            if restored is not None:
+                meta, decisions, notes = restored
+                for name in SESSION_META_KEYS:
+                    if name in meta:
+                        st.session_state[name] = meta[name]
+                known_pairs = set(gene_pairs)
+                st.session_state.gene_decisions.update(
+                    (key, value) for key, value in decisions.items() if key in known_pairs)
+                st.session_state.user_comments.update(
+                    (key, value) for key, value in notes.items() if key in known_pairs)
+                st.session_state.review_session_id = resume_session[1]
+            else:
+                st.session_state.review_session_id = uuid.uuid4().hex[:12]
+            # Läuft die Sitzung bereits in einem anderen Browser, gilt deren
+            # aktueller Stand (auch noch nicht gespeicherte Änderungen)
+            get_shared_sessions().get_or_create(
+                file_hash, st.session_state.review_session_id,
+                *(restored[1:] if restored is not None else ()))
+            st.session_state.shared_version = 0
+            sync_shared_state()
 
             st.rerun()
 
@@ -597,20 +1609,28 @@ else:
 
 
 # === ZUSAMMENFASSUNGS-ANSICHT ===
-if st.session_state.df is not None and not st.session_state.review_started:
+if st.session_state.summary_df is not None and not st.session_state.review_started:
     sdf = st.session_state.summary_df
     # PATCH: Anzahl Gene = Anzahl (gene, disease) Paare
     n_genes = len(st.session_state.gene_pairs)
     n_responses = st.session_state.total_responses
 
-    n_national_80 = (sdf['National_Ja_pct'] >= 80).sum()
-    n_studie_80   = ((sdf['National_Ja_pct'] < 80) & (sdf['Studie_Ja_pct'] >= 80)).sum()
-    n_keine       = ((sdf['National_Ja_pct'] < 80) & (sdf['Studie_Ja_pct'] < 80)).sum()
+    n_national_80, n_studie_80, n_keine = (
+        np.bincount(sdf['Umfrage_Empfehlung'].cat.codes, minlength=len(RECOMMENDATION_LABELS))
+        if not sdf.empty else (0, 0, 0)
+    )
     n_kommentare_nat  = (sdf['Kommentare_National'] != '').sum()
     n_kommentare_stud = (sdf['Kommentare_Studie']   != '').sum()
 
     st.markdown("## 📊 Übersicht der eingelesenen Daten")
     st.markdown("*Datei erfolgreich eingelesen – bitte prüfen Sie die Zusammenfassung vor der Bewertung.*")
+    parse_info = st.session_state.parse_info
+    if parse_info:
+        st.caption(
+            f"Encoding: {parse_info['encoding']} · Parser: {parse_info['engine']} · "
+            f"Spalten: {parse_info['columns'][0]}/{parse_info['columns'][1]} · "
+            f"Einlesedauer: {parse_info['seconds'] * 1000:.0f} ms"
+        )
     st.markdown("---")
 
     c1, c2, c3 = st.columns(3)
@@ -674,10 +1694,9 @@ if st.session_state.df is not None and not st.session_state.review_started:
     preview = sdf[['Gen', 'Erkrankung', 'National_Ja_pct', 'Studie_Ja_pct']].copy()
     preview.columns = ['Gen', 'Erkrankung', 'National (% Ja)', 'Studie (% Ja)']
     preview.index = range(1, len(preview) + 1)
-    preview['Vorläufig'] = preview.apply(
-        lambda r: '🟢 National' if r['National (% Ja)'] >= 80
-        else ('🟡 Studie' if r['Studie (% Ja)'] >= 80 else '🔴 Keine'), axis=1
-    )
+    preview['Vorläufig'] = np.array(RECOMMENDATION_SHORT, dtype=object)[
+        sdf['Umfrage_Empfehlung'].cat.codes.to_numpy()
+    ]
     # PATCH: Warnzeichen für fehlende wiss-Spalten
     preview['⚠️'] = sdf['Wiss_fehlend'].apply(lambda x: '⚠️' if x else '')
     st.dataframe(preview, use_container_width=True, height=min(400, 36 + n_genes * 35))
@@ -690,8 +1709,10 @@ if st.session_state.df is not None and not st.session_state.review_started:
     st.markdown("#### 👥 Anwesende Teilnehmer")
     st.markdown("<small style='color:#666;'>Wählen Sie die Teilnehmer des Review-Meetings aus:</small>", unsafe_allow_html=True)
 
-    if st.session_state.attendees_list:
-        attendee_options = sorted(st.session_state.attendees_list.keys())
+    if reference_data['attendees_list'] is None:
+        st.caption("⏳ Teilnehmerliste wird geladen…")
+    elif reference_data['attendees_list']:
+        attendee_options = sorted(reference_data['attendees_list'].keys())
         selected_pills = st.pills(
             "Teilnehmer", options=attendee_options, selection_mode="multi",
             label_visibility="collapsed", key="attendee_pills",
@@ -707,7 +1728,7 @@ if st.session_state.df is not None and not st.session_state.review_started:
             st.markdown("<small style='color:#666;'>**Vorschau:**</small>", unsafe_allow_html=True)
             all_attendees = []
             for abbr in (selected_pills or []):
-                full_name = st.session_state.attendees_list.get(abbr, abbr)
+                full_name = reference_data['attendees_list'].get(abbr, abbr)
                 all_attendees.append(f"{abbr} ({full_name})")
             if additional and additional.strip():
                 additional_names = [name.strip() for name in additional.split(',') if name.strip()]
@@ -719,6 +1740,8 @@ if st.session_state.df is not None and not st.session_state.review_started:
             st.session_state.selected_attendees = selected_pills if selected_pills else []
             st.session_state.additional_attendees = additional
             st.session_state.attendees_confirmed = True
+            log_review_event(None, 'attendees', None, attendee_names())
+            autosave_session()
             st.success("✓ Teilnehmer gespeichert!")
         if attendees_confirmed:
             st.success("✓ Teilnehmer bestätigt")
@@ -729,7 +1752,7 @@ if st.session_state.df is not None and not st.session_state.review_started:
     st.markdown("#### 🏷️ Erkrankungsgruppe dieser Session")
     st.markdown("<small style='color:#666;'>Wählen Sie die Erkrankungsgruppe, der alle Gen-Erkrankungs-Kombinationen dieser Session zugeordnet werden:</small>", unsafe_allow_html=True)
 
-    group_options  = st.session_state.disease_groups_list or []
+    group_options  = reference_data['disease_groups_list'] or []
     group_confirmed = st.session_state.get('group_confirmed', False)
     selected_group = st.selectbox(
         "Erkrankungsgruppe",
@@ -745,6 +1768,7 @@ if st.session_state.df is not None and not st.session_state.review_started:
         else:
             st.session_state.selected_disease_group = selected_group
             st.session_state.group_confirmed = True
+            autosave_session()
             st.success(f"✓ Erkrankungsgruppe gespeichert: {selected_group}")
     if group_confirmed:
         st.success(f"✓ Erkrankungsgruppe bestätigt: **{st.session_state.selected_disease_group}**")
@@ -762,6 +1786,7 @@ if st.session_state.df is not None and not st.session_state.review_started:
     with col_btn:
         if st.button('▶ Bewertung starten', type='primary', use_container_width=True, disabled=not session_ready):
             st.session_state.review_started = True
+            autosave_session()
             st.rerun()
 
 
@@ -790,7 +1815,7 @@ def generate_csv():
 
     attendees_str = ""
     if st.session_state.selected_attendees:
-        attendees_names = [st.session_state.attendees_list.get(abbr, abbr)
+        attendees_names = [(reference_data['attendees_list'] or {}).get(abbr, abbr)
                            for abbr in st.session_state.selected_attendees]
         attendees_str = "; ".join(attendees_names)
         if hasattr(st.session_state, 'additional_attendees') and st.session_state.additional_attendees:
@@ -803,66 +1828,31 @@ def generate_csv():
 
     export_df.insert(3, 'Anwesende_Teilnehmer', attendees_str)
 
-    # Detaillierte Antwortzahlen
-    df = st.session_state.df
-    gene_col_index = st.session_state.gene_col_index
+    # Detaillierte Antwortzahlen – aus der beim Import berechneten Zähltabelle
+    counts = st.session_state.answer_counts.reindex(
+        pd.MultiIndex.from_tuples(export_df['_key'].tolist()), fill_value=0
+    )
+    export_df['National_Ja_n']   = counts['nat_ja'].to_numpy()
+    export_df['National_Nein_n'] = counts['nat_nein'].to_numpy()
+    export_df['National_NA_n']   = counts['nat_na'].to_numpy()
+    export_df['Studie_Ja_n']     = counts['wiss_ja'].to_numpy()
+    export_df['Studie_Nein_n']   = counts['wiss_nein'].to_numpy()
+    export_df['Studie_NA_n']     = counts['wiss_na'].to_numpy()
 
-    national_ja, national_nein, national_na = [], [], []
-    studie_ja,   studie_nein,   studie_na   = [], [], []
-
-    # PATCH: Iteration über (gene, disease) Paare
-    for key in export_df['_key']:
-        cols = gene_col_index.get(key, {'nat_q': [], 'wiss_q': []})
-        nat_data  = df[cols['nat_q']].stack().dropna()  if cols['nat_q']  else pd.Series(dtype=str)
-        stud_data = df[cols['wiss_q']].stack().dropna() if cols['wiss_q'] else pd.Series(dtype=str)
-
-        national_ja.append((nat_data   == 'Ja').sum())
-        national_nein.append((nat_data  == 'Nein').sum())
-        national_na.append((nat_data    == 'Ich kann diese Frage nicht beantworten').sum())
-        studie_ja.append((stud_data     == 'Ja').sum())
-        studie_nein.append((stud_data   == 'Nein').sum())
-        studie_na.append((stud_data     == 'Ich kann diese Frage nicht beantworten').sum())
-
-    export_df['National_Ja_n']   = national_ja
-    export_df['National_Nein_n'] = national_nein
-    export_df['National_NA_n']   = national_na
-    export_df['Studie_Ja_n']     = studie_ja
-    export_df['Studie_Nein_n']   = studie_nein
-    export_df['Studie_NA_n']     = studie_na
-
-    # Automatische Empfehlung
-    umfrage_empfehlung = []
-    for _, row in export_df.iterrows():
-        if row['National_Ja_pct'] >= 80:
-            umfrage_empfehlung.append('Aufnahme in nationales gNBS')
-        elif row['Studie_Ja_pct'] >= 80:
-            umfrage_empfehlung.append('Aufnahme in wissenschaftliche gNBS Studie')
-        else:
-            umfrage_empfehlung.append('Keine Berücksichtigung im gNBS')
-    export_df['Umfrage_Empfehlung'] = umfrage_empfehlung
+    # Automatische Empfehlung – beim Import klassifiziert, hier nur ans Spaltenende
+    export_df['Umfrage_Empfehlung'] = export_df.pop('Umfrage_Empfehlung').astype(str)
 
     # Expertengruppen-Entscheidung – PATCH: Lookup per (gene, disease) Tupel
-    decision_clean = []
-    for key in export_df['_key']:
-        decision = st.session_state.gene_decisions.get(key, 'Noch nicht bewertet')
-        clean = decision.replace('🟢 ', '').replace('🟡 ', '').replace('🔴 ', '').replace('⚪ ', '')
-        decision_clean.append(clean)
-    export_df['Expertengruppe_Entscheidung'] = decision_clean
+    decisions = pd.Series(
+        [st.session_state.gene_decisions.get(key, NOT_RATED) for key in export_df['_key']],
+        index=export_df.index, dtype=object
+    )
+    export_df['Expertengruppe_Entscheidung'] = decisions.str.replace(DECISION_EMOJI_RE, '', regex=True)
 
     # Abweichungsanalyse
-    abweichung, abweichung_typ = [], []
-    for _, row in export_df.iterrows():
-        umfrage = row['Umfrage_Empfehlung']
-        experte = row['Expertengruppe_Entscheidung']
-        if experte == 'Noch nicht bewertet':
-            abweichung.append('Nicht bewertet'); abweichung_typ.append('')
-        elif umfrage == experte:
-            abweichung.append('Keine Abweichung'); abweichung_typ.append('')
-        else:
-            abweichung.append('Abweichung')
-            abweichung_typ.append(f'Umfrage: {umfrage} → Experten: {experte}')
-    export_df['Abweichung_von_Umfrage'] = abweichung
-    export_df['Abweichung_Details']     = abweichung_typ
+    export_df['Abweichung_von_Umfrage'], export_df['Abweichung_Details'] = classify_deviations(
+        export_df['Umfrage_Empfehlung'], export_df['Expertengruppe_Entscheidung']
+    )
 
     # Notizen – PATCH: Lookup per (gene, disease) Tupel
     export_df['Expertengruppe_Notizen'] = [
@@ -889,351 +1879,173 @@ def generate_csv():
     return csv_buffer.getvalue().encode('utf-8-sig')
 
 
-def generate_pdf():
-    """PDF-Export. PATCH: Iteration über gene_pairs (Tupel), Lookups per (gene, disease)."""
-
-    class PageNumCanvas(canvas.Canvas):
-        def __init__(self, *args, **kwargs):
-            canvas.Canvas.__init__(self, *args, **kwargs)
-            self.pages = []
-            self.creation_date = datetime.now().strftime('%d.%m.%Y')
-
-        def showPage(self):
-            self.pages.append(dict(self.__dict__))
-            self._startPage()
-
-        def save(self):
-            page_count = len(self.pages)
-            for page_num, page in enumerate(self.pages, start=1):
-                self.__dict__.update(page)
-                self.draw_page_number(page_num, page_count)
-                canvas.Canvas.showPage(self)
-            canvas.Canvas.save(self)
-
-        def draw_page_number(self, page_num, page_count):
-            self.setStrokeColor(colors.grey)
-            self.setLineWidth(0.5)
-            self.line(0.75*inch, 0.5*inch, A4[0] - 0.75*inch, 0.5*inch)
-            self.setFont('Helvetica', 8)
-            self.setFillColor(colors.grey)
-            self.drawString(0.75*inch, 0.35*inch, f"Erstellt am: {self.creation_date}")
-            page_text = f"Seite {page_num} von {page_count}"
-            page_text_width = self.stringWidth(page_text, 'Helvetica', 8)
-            center_x = (A4[0] - page_text_width) / 2
-            if center_x < 0.75*inch + 100:
-                center_x = 0.75*inch + 100
-            self.drawString(center_x, 0.35*inch, page_text)
-            try:
-                logo_path = "uk_akro.jpg"
-                if os.path.exists(logo_path):
-                    logo_height = 0.4*inch
-                    logo_width  = logo_height * 2
-                    self.drawImage(logo_path, A4[0] - 0.5*inch - logo_width, 0.25*inch,
-                                   width=logo_width, height=logo_height,
-                                   preserveAspectRatio=True, mask='auto')
-            except:
-                pass
+# Paralleler PDF-Export: ab PDF_PARALLEL_MIN_PAIRS Paaren werden die
+# Paarseiten in Blöcken von PDF_CHUNK_PAIRS Paaren in bis zu PDF_WORKERS
+# Prozessen gerendert und mit Titel/Inhaltsverzeichnis/Infoseite zusammengeführt
+PDF_WORKERS = int(os.environ.get('GNBS_PDF_WORKERS', os.cpu_count() or 1))
+PDF_PARALLEL_MIN_PAIRS = int(os.environ.get('GNBS_PDF_PARALLEL_MIN_PAIRS', '300'))
+PDF_CHUNK_PAIRS = 100
+PDF_WORKER_SCRIPT = os.path.join(APP_DIR, 'pdf_export.py')
 
-    pdf_buffer = io.BytesIO()
-    doc = SimpleDocTemplate(pdf_buffer, pagesize=A4,
-                            topMargin=0.75*inch, bottomMargin=0.75*inch,
-                            leftMargin=0.75*inch, rightMargin=0.75*inch)
-
-    styles = getSampleStyleSheet()
-    title_style   = ParagraphStyle('CustomTitle',  parent=styles['Heading1'],
-                                   fontSize=18, textColor=colors.HexColor('#1f77b4'),
-                                   spaceAfter=20, alignment=TA_CENTER)
-    gene_style    = ParagraphStyle('GeneName',     parent=styles['Heading2'],
-                                   fontSize=14, textColor=colors.HexColor('#2ca02c'),
-                                   spaceAfter=6, spaceBefore=12)
-    disease_style = ParagraphStyle('DiseaseName',  parent=styles['Normal'],
-                                   fontSize=11, textColor=colors.grey,
-                                   spaceAfter=12, italic=True)
-    section_style = ParagraphStyle('SectionHeader',parent=styles['Heading3'],
-                                   fontSize=12, textColor=colors.HexColor('#333333'),
-                                   spaceAfter=8, spaceBefore=10)
-    comment_style = ParagraphStyle('CommentText',  parent=styles['Normal'],
-                                   fontSize=9, leftIndent=20, spaceAfter=6)
-    toc_style     = ParagraphStyle('TOCEntry',     parent=styles['Normal'],
-                                   fontSize=10, leftIndent=20, spaceAfter=6,
-                                   textColor=colors.HexColor('#1f77b4'))
 
-    story = []
-    gene_pairs     = st.session_state.gene_pairs
-    gene_col_index = st.session_state.gene_col_index
-    df             = st.session_state.df
+@st.cache_resource
+def get_pdf_styles():
+    """Style-Registry des PDF-Exports (pdf_export.build_pdf_styles), einmal pro Prozess."""
+    return build_pdf_styles()
+
+
+@st.cache_resource
+def get_pdf_pool():
+    """
+    Pool des parallelen PDF-Exports, einmal pro Prozess angelegt und von
+    allen Sessions geteilt; begrenzt die gleichzeitig laufenden Worker auf
+    PDF_WORKERS.
+    """
+    return ThreadPoolExecutor(max_workers=PDF_WORKERS, thread_name_prefix='gnbs-pdf')
+
+
+def render_chunk_process(specs, creation_date):
+    """
+    Rendert einen Block in einem eigenen Python-Prozess (pdf_export.main).
+    Kein multiprocessing: unter Streamlit ist __main__ das App-Skript, das
+    spawn/forkserver in jedem Worker erneut ausführen würden, und fork aus dem
+    mehrthreadigen Server ist nicht sicher.
+
+    Bricht der Worker ab, enthält der RuntimeError dessen Fehlerausgabe.
+    """
+    result = subprocess.run([sys.executable, PDF_WORKER_SCRIPT],
+                            input=pickle.dumps((specs, creation_date)),
+                            capture_output=True)
+    if result.returncode != 0:
+        stderr = result.stderr.decode('utf-8', errors='replace').strip()
+        raise RuntimeError(f"PDF-Worker beendet mit Exit-Code {result.returncode}:\n{stderr}")
+    return pickle.loads(result.stdout)
+
+
+def pair_decision_text(decision):
+    """Entscheidung ohne Emoji für das PDF, None = noch nicht bewertet."""
+    if not decision or decision == NOT_RATED:
+        return None
+    return DECISION_EMOJI_RE.sub('', decision)
+
+
+def pair_flowables_cached(key, overlap_group, pdf_styles):
+    """
+    Flowables eines Paares aus dem Session-Cache (pdf_fragments) oder neu
+    gebaut. Gültig, solange Umfrage, NBS-Overlap, Entscheidung und Notiz des
+    Paares gleich bleiben – nach einzelnen Änderungen werden beim nächsten
+    PDF nur die betroffenen Paare neu aufgebaut.
+
+    doc.build() setzt Layout-Zustand auf den übergebenen Flowables (z.B.
+    _postponed beim Umbruch); zurückgegeben werden daher flache Kopien, die
+    gecachten Originale bleiben unberührt.
+    """
+    decision = st.session_state.gene_decisions.get(key, NOT_RATED)
+    reviewer_comment = st.session_state.user_comments.get(key, '')
+    fragment_key = (st.session_state.survey_hash, overlap_group, decision, reviewer_comment)
+
+    cached = st.session_state.pdf_fragments.get(key)
+    if cached is None or cached[0] != fragment_key:
+        flowables = build_pair_flowables(
+            key[0], key[1], st.session_state.answer_counts.loc[key],
+            st.session_state.comment_store[key], overlap_group,
+            pair_decision_text(decision), reviewer_comment, pdf_styles
+        )
+        cached = st.session_state.pdf_fragments[key] = (fragment_key, flowables)
+    return [copy.copy(f) for f in cached[1]]
+
+
+def pair_chunk_spec(key, toc_entry, overlap_group):
+    """Picklebare Eingaben einer Paarseite für pdf_export.render_pair_chunk()."""
+    counts = {col: int(value) for col, value in st.session_state.answer_counts.loc[key].items()}
+    return (toc_entry, key[0], key[1], counts, st.session_state.comment_store[key],
+            overlap_group, pair_decision_text(st.session_state.gene_decisions.get(key, NOT_RATED)),
+            st.session_state.user_comments.get(key, ''))
 
-    # Titelseite
+
+def render_pair_chunks(chunks, creation_date, progress=None):
+    """
+    Rendert die Blöcke parallel (render_chunk_process). Ergebnisse liegen
+    pro Session in pdf_chunks (Hash der Block-Eingaben -> Ergebnis);
+    unveränderte Blöcke werden beim nächsten Export nicht neu gerendert.
+
+    progress(fertig, gesamt) wird nach jedem Block aufgerufen.
+    """
+    chunk_cache = st.session_state.pdf_chunks
+    chunk_hashes = [hashlib.sha256(pickle.dumps((specs, creation_date))).hexdigest()
+                    for specs in chunks]
+    results = [chunk_cache.get(chunk_hash) for chunk_hash in chunk_hashes]
+
+    pool = get_pdf_pool()
+    futures = {pool.submit(render_chunk_process, specs, creation_date): chunk_idx
+               for chunk_idx, specs in enumerate(chunks) if results[chunk_idx] is None}
+    done = len(chunks) - len(futures)
+    if progress:
+        progress(done, len(chunks))
+    for future in as_completed(futures):
+        results[futures[future]] = future.result()
+        done += 1
+        if progress:
+            progress(done, len(chunks))
+
+    st.session_state.pdf_chunks = dict(zip(chunk_hashes, results))
+    return results
+
+
+def pdf_title_flowables(para_styles):
+    """Titelseite: Eckdaten, Erkrankungsgruppe, Anwesende (ohne PageBreak)."""
+    title_style = para_styles['title']
+    gene_pairs  = st.session_state.gene_pairs
+
+    story = []
     story.append(Paragraph("Expertenreview gNBS", title_style))
-    story.append(Paragraph(f"Dokumentation vom {datetime.now().strftime('%d.%m.%Y')}", styles['Normal']))
+    story.append(Paragraph(f"Dokumentation vom {datetime.now().strftime('%d.%m.%Y')}", para_styles['normal']))
     story.append(Spacer(1, 12))
-    story.append(Paragraph(f"Gesamtanzahl Responses: {st.session_state.total_responses}", styles['Normal']))
+    story.append(Paragraph(f"Gesamtanzahl Responses: {st.session_state.total_responses}", para_styles['normal']))
     # PATCH: Anzahl = len(gene_pairs)
-    story.append(Paragraph(f"Anzahl Gen-Erkrankungs-Kombinationen: {len(gene_pairs)}", styles['Normal']))
+    story.append(Paragraph(f"Anzahl Gen-Erkrankungs-Kombinationen: {len(gene_pairs)}", para_styles['normal']))
     disease_group = st.session_state.get('selected_disease_group', '')
     if disease_group:
-        story.append(Paragraph(f"Erkrankungsgruppe: <b>{disease_group}</b>", styles['Normal']))
+        story.append(Paragraph(f"Erkrankungsgruppe: <b>{disease_group}</b>", para_styles['normal']))
     story.append(Spacer(1, 20))
 
     if st.session_state.selected_attendees or (hasattr(st.session_state, 'additional_attendees') and st.session_state.additional_attendees):
-        story.append(Paragraph("<b>Anwesende:</b>", styles['Heading3']))
-        attendees_list = [st.session_state.attendees_list.get(a, a) for a in st.session_state.selected_attendees]
-        if hasattr(st.session_state, 'additional_attendees') and st.session_state.additional_attendees:
-            attendees_list.extend([n.strip() for n in st.session_state.additional_attendees.split(',') if n.strip()])
-        for attendee in attendees_list:
-            story.append(Paragraph(f"• {attendee}", styles['Normal']))
+        story.append(Paragraph("<b>Anwesende:</b>", para_styles['heading3']))
+        for attendee in attendee_names():
+            story.append(Paragraph(f"• {attendee}", para_styles['normal']))
         story.append(Spacer(1, 12))
+    return story
 
-    story.append(PageBreak())
 
-    # Inhaltsverzeichnis – PATCH: Tab-Label = "GENE · Erkrankung"
-    story.append(Paragraph("Inhaltsverzeichnis", title_style))
-    story.append(Spacer(1, 12))
-    for idx, (gene, disease) in enumerate(gene_pairs):
+def pdf_toc_flowables(toc_entries, pdf_styles, links=True):
+    """
+    Inhaltsverzeichnis – PATCH: Tab-Label = "GENE · Erkrankung".
+    Seitenzahlen kommen aus den Seitenankern (ReviewDocTemplate); Links nur,
+    wenn die Anker im selben Dokument liegen.
+    """
+    para_styles = pdf_styles['para']
+    story = [Paragraph("Inhaltsverzeichnis", para_styles['title']), Spacer(1, 12)]
+    toc_rows = []
+    for (gene, disease), (_, anchor) in zip(st.session_state.gene_pairs, toc_entries):
         disease_display = disease[:1].upper() + disease[1:] if disease else ''
-        page_num = idx + 3
         toc_text = f'<b><i>{gene}</i></b> – {disease_display}'
-        toc_data = [[Paragraph(toc_text, toc_style), str(page_num)]]
-        toc_table = Table(toc_data, colWidths=[5.5*inch, 0.5*inch])
-        toc_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-            ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTNAME',  (1, 0), (1, 0), 'Helvetica'),
-            ('FONTSIZE',  (1, 0), (1, 0), 10),
-            ('TEXTCOLOR', (1, 0), (1, 0), colors.HexColor('#1f77b4')),
-        ]))
-        story.append(toc_table)
-    story.append(PageBreak())
-
-    # Seiten pro Gen-Erkrankungs-Kombination
-    for pair_idx, (gene, disease) in enumerate(gene_pairs):
-        key = (gene, disease)
-        disease_display = disease[:1].upper() + disease[1:] if disease else ''
-        overlap_group = st.session_state.nbs_overlap.get(gene, None)
-
-        header_left = Paragraph(f"<b><i>{gene}</i></b>", gene_style)
-
-        if overlap_group == "NBS":
-            badge_text, badge_color = "✓ Im NBS", colors.HexColor('#2196F3')
-        elif overlap_group == "NGS2025":
-            badge_text, badge_color = "✓ NGS2025", colors.HexColor('#FF9800')
-        else:
-            badge_text, badge_color = None, None
-
-        if badge_text:
-            badge_para  = Paragraph(f"<font color='white' size='9'><b>{badge_text}</b></font>",
-                                    ParagraphStyle('BadgeText', alignment=1))
-            badge_table = Table([[badge_para]], colWidths=[0.9*inch])
-            badge_table.setStyle(TableStyle([
-                ('BACKGROUND',   (0,0),(-1,-1), badge_color),
-                ('TEXTCOLOR',    (0,0),(-1,-1), colors.white),
-                ('ALIGN',        (0,0),(-1,-1), 'CENTER'),
-                ('VALIGN',       (0,0),(-1,-1), 'MIDDLE'),
-                ('TOPPADDING',   (0,0),(-1,-1), 4),
-                ('BOTTOMPADDING',(0,0),(-1,-1), 4),
-                ('LEFTPADDING',  (0,0),(-1,-1), 8),
-                ('RIGHTPADDING', (0,0),(-1,-1), 8),
-                ('ROUNDEDCORNERS', [4,4,4,4]),
-            ]))
-            header_right = badge_table
-        else:
-            header_right = ''
-
-        header_table = Table([[header_left, header_right]], colWidths=[4.6*inch, 1.4*inch])
-        header_table.setStyle(TableStyle([
-            ('ALIGN',  (0,0),(0,0), 'LEFT'),
-            ('ALIGN',  (1,0),(1,0), 'RIGHT'),
-            ('VALIGN', (0,0),(-1,-1), 'TOP'),
-        ]))
-        story.append(header_table)
-        story.append(Paragraph(disease_display, disease_style))
-        story.append(Spacer(1, 6))
-
-        # PATCH: Spalten aus gene_col_index
-        cols = gene_col_index.get(key, {'nat_q':[], 'nat_kom':[], 'wiss_q':[], 'wiss_kom':[]})
-        nat_data  = df[cols['nat_q']].stack().dropna()  if cols['nat_q']  else pd.Series(dtype=str)
-        stud_data = df[cols['wiss_q']].stack().dropna() if cols['wiss_q'] else pd.Series(dtype=str)
-
-        nat_ja    = (nat_data  == 'Ja').sum()
-        nat_nein  = (nat_data  == 'Nein').sum()
-        nat_na    = (nat_data  == 'Ich kann diese Frage nicht beantworten').sum()
-        nat_total = len(nat_data)
-        nat_ja_pct   = nat_ja   / nat_total  * 100 if nat_total  > 0 else 0
-
-        stud_ja   = (stud_data == 'Ja').sum()
-        stud_nein = (stud_data == 'Nein').sum()
-        stud_na   = (stud_data == 'Ich kann diese Frage nicht beantworten').sum()
-        stud_total = len(stud_data)
-        stud_ja_pct  = stud_ja  / stud_total * 100 if stud_total > 0 else 0
-
-        nat_ja_pct_str  = f'{nat_ja}  ({nat_ja_pct:.1f}%)'
-        nat_nei_str     = f'{nat_nein} ({(nat_nein/nat_total*100) if nat_total else 0:.1f}%)'
-        nat_na_str      = f'{nat_na}   ({(nat_na/nat_total*100)   if nat_total else 0:.1f}%)'
-        stud_ja_pct_str = f'{stud_ja}  ({stud_ja_pct:.1f}%)'  if stud_total else 'n/a'
-        stud_nei_str    = f'{stud_nein} ({(stud_nein/stud_total*100) if stud_total else 0:.1f}%)' if stud_total else 'n/a'
-        stud_na_str     = f'{stud_na}   ({(stud_na/stud_total*100)   if stud_total else 0:.1f}%)' if stud_total else 'n/a'
-
-        data = [
-            ['', 'Nationales Screening', 'Wissenschaftliche Studie'],
-            ['Ja',                  nat_ja_pct_str,  stud_ja_pct_str],
-            ['Nein',                nat_nei_str,     stud_nei_str],
-            ['Kann nicht beantworten', nat_na_str,   stud_na_str],
-            ['Gesamt',              f'n={nat_total}', f'n={stud_total}' if stud_total else 'n/a'],
-            ['Cut-Off (≥80%)',      '✓' if nat_ja_pct >= 80 else '✗',
-                                    '✓' if stud_ja_pct >= 80 else ('–' if not stud_total else '✗')]
-        ]
-        t = Table(data, colWidths=[2.2*inch, 2*inch, 2*inch])
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0,0),(-1,0), colors.HexColor('#f0f0f0')),
-            ('ALIGN',      (0,0),(-1,-1), 'CENTER'),
-            ('FONTNAME',   (0,0),(-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE',   (0,0),(-1,0), 10),
-            ('FONTSIZE',   (0,1),(-1,-1), 9),
-            ('BOTTOMPADDING', (0,0),(-1,0), 8),
-            ('BACKGROUND', (0,1),(0,-1), colors.HexColor('#fafafa')),
-            ('GRID',       (0,0),(-1,-1), 0.5, colors.grey),
-            ('ROWBACKGROUNDS', (1,1),(-1,-2), [colors.white, colors.HexColor('#f9f9f9')]),
-        ]))
-        story.append(t)
-        story.append(Spacer(1, 15))
-
-        # Ergebnis-Box
-        story.append(Paragraph("<b>Ergebnis der Umfrage:</b>", section_style))
-        if nat_ja_pct >= 80:
-            result_color, text_color = colors.HexColor('#E8F5E9'), colors.HexColor('#2E7D32')
-            result_text = "≥80% Zustimmung für nationales gNBS"
-        elif stud_ja_pct >= 80:
-            result_color, text_color = colors.HexColor('#FFF8E1'), colors.HexColor('#F57F17')
-            result_text = "≥80% Zustimmung für wissenschaftliche Studie"
-        else:
-            result_color, text_color = colors.HexColor('#FFEBEE'), colors.HexColor('#C62828')
-            result_text = "<80% Zustimmung für Berücksichtigung im gNBS"
-
-        rt = Table([[result_text]], colWidths=[5.5*inch])
-        rt.setStyle(TableStyle([
-            ('BACKGROUND', (0,0),(-1,-1), result_color),
-            ('TEXTCOLOR',  (0,0),(-1,-1), text_color),
-            ('ALIGN',      (0,0),(-1,-1), 'CENTER'),
-            ('FONTNAME',   (0,0),(-1,-1), 'Helvetica-Bold'),
-            ('FONTSIZE',   (0,0),(-1,-1), 10),
-            ('TOPPADDING', (0,0),(-1,-1), 8),
-            ('BOTTOMPADDING',(0,0),(-1,-1), 8),
-        ]))
-        story.append(rt)
-        story.append(Spacer(1, 10))
-
-        # Kommentare – PATCH: aus gene_col_index
-        story.append(Paragraph("<b>Kommentare aus der Umfrage:</b>", section_style))
-        nat_comments  = [_clean_str(c) for c in df[cols['nat_kom']].stack().dropna()
-                         if _clean_str(c)] if cols['nat_kom'] else []
-        stud_comments = [_clean_str(c) for c in df[cols['wiss_kom']].stack().dropna()
-                         if _clean_str(c)] if cols['wiss_kom'] else []
-
-        def make_comment_table(label, comment_list, bg_color, label_color):
-            rows = [[Paragraph(f"<b>{label}</b>",
-                               ParagraphStyle('CLabel', fontSize=8,
-                                              textColor=label_color, fontName='Helvetica-Bold'))]]
-            for c in comment_list:
-                safe = c.replace('&','&amp;').replace('<','&lt;').replace('>','&gt;')
-                rows.append([Paragraph(f"• {safe}",
-                                       ParagraphStyle('CText', fontSize=8, leading=11, leftIndent=8))])
-            ct = Table(rows, colWidths=[5.3*inch])
-            ct.setStyle(TableStyle([
-                ('BACKGROUND',   (0,0),(-1,-1), bg_color),
-                ('TOPPADDING',   (0,0),(-1,-1), 5),
-                ('BOTTOMPADDING',(0,0),(-1,-1), 5),
-                ('LEFTPADDING',  (0,0),(-1,-1), 10),
-                ('RIGHTPADDING', (0,0),(-1,-1), 10),
-            ]))
-            return ct
-
-        if nat_comments:
-            story.append(make_comment_table("National", nat_comments,
-                                            colors.HexColor('#EAF4EA'), colors.HexColor('#2E7D32')))
-            story.append(Spacer(1, 6))
-        if stud_comments:
-            story.append(make_comment_table("Studie", stud_comments,
-                                            colors.HexColor('#FFF8E1'), colors.HexColor('#F57F17')))
-            story.append(Spacer(1, 6))
-        if not nat_comments and not stud_comments:
-            story.append(Paragraph("Keine Kommentare", comment_style))
-            story.append(Spacer(1, 6))
-
-        story.append(Spacer(1, 15))
-        story.append(HRFlowable(width="100%", thickness=1, color=colors.grey, spaceAfter=15))
-
-        # Entscheidung – PATCH: Lookup per (gene, disease) Tupel
-        decision = st.session_state.gene_decisions.get(key, 'Noch nicht bewertet')
-        story.append(Paragraph("<b>Entscheidung der Expertengruppe:</b>", section_style))
-
-        if decision and decision != 'Noch nicht bewertet':
-            decision_text = decision.replace('🟢 ','').replace('🟡 ','').replace('🔴 ','').replace('⚪ ','')
-            if 'nationales gNBS'    in decision: box_color = colors.HexColor('#4CAF50')
-            elif 'wissenschaftliche' in decision: box_color = colors.HexColor('#FFC107')
-            elif 'Keine'            in decision: box_color = colors.HexColor('#F44336')
-            else:                                 box_color = colors.HexColor('#9E9E9E')
-            dt = Table([[decision_text]], colWidths=[5.5*inch])
-            dt.setStyle(TableStyle([
-                ('BACKGROUND',   (0,0),(-1,-1), box_color),
-                ('TEXTCOLOR',    (0,0),(-1,-1), colors.white),
-                ('ALIGN',        (0,0),(-1,-1), 'CENTER'),
-                ('FONTNAME',     (0,0),(-1,-1), 'Helvetica-Bold'),
-                ('FONTSIZE',     (0,0),(-1,-1), 11),
-                ('TOPPADDING',   (0,0),(-1,-1), 10),
-                ('BOTTOMPADDING',(0,0),(-1,-1), 10),
-            ]))
-            story.append(dt)
-        else:
-            nd = Table([["Noch nicht bewertet"]], colWidths=[5.5*inch])
-            nd.setStyle(TableStyle([
-                ('BACKGROUND', (0,0),(-1,-1), colors.HexColor('#F5F5F5')),
-                ('TEXTCOLOR',  (0,0),(-1,-1), colors.HexColor('#999999')),
-                ('ALIGN',      (0,0),(-1,-1), 'CENTER'),
-                ('FONTNAME',   (0,0),(-1,-1), 'Helvetica'),
-                ('FONTSIZE',   (0,0),(-1,-1), 10),
-                ('TOPPADDING', (0,0),(-1,-1), 8),
-                ('BOTTOMPADDING',(0,0),(-1,-1), 8),
-            ]))
-            story.append(nd)
-
-        story.append(Spacer(1, 10))
-
-        # Notizen – PATCH: Lookup per (gene, disease) Tupel
-        reviewer_comment = st.session_state.user_comments.get(key, '')
-        if reviewer_comment:
-            story.append(Paragraph("<b>Zusätzliche Notizen:</b>", section_style))
-            safe_rc = reviewer_comment.replace('&','&amp;').replace('<','&lt;').replace('>','&gt;')
-            nt = Table([[Paragraph(safe_rc.replace('\n','<br/>'),
-                                   ParagraphStyle('NoteText', fontSize=8, leading=12, leftIndent=4))]],
-                       colWidths=[5.3*inch])
-            nt.setStyle(TableStyle([
-                ('BACKGROUND',   (0,0),(-1,-1), colors.HexColor('#F0F4FF')),
-                ('TOPPADDING',   (0,0),(-1,-1), 8),
-                ('BOTTOMPADDING',(0,0),(-1,-1), 8),
-                ('LEFTPADDING',  (0,0),(-1,-1), 10),
-                ('RIGHTPADDING', (0,0),(-1,-1), 10),
-            ]))
-            story.append(nt)
-            story.append(Spacer(1, 10))
-
-        story.append(Spacer(1, 5))
-        story.append(HRFlowable(width="100%", thickness=1, color=colors.grey, spaceAfter=10))
-
-        if pair_idx < len(gene_pairs) - 1:
-            story.append(PageBreak())
-
-    # Letzte Seite: Dokumentationsinfos (unverändert)
-    story.append(PageBreak())
-    story.append(Spacer(1, 50))
-    info_title_style = ParagraphStyle('InfoTitle', parent=styles['Heading1'],
-                                      fontSize=16, textColor=colors.HexColor('#1f77b4'),
-                                      spaceAfter=30, alignment=TA_CENTER)
+        if links:
+            toc_text = f'<a href="#{anchor}">{toc_text}</a>'
+        toc_rows.append([Paragraph(toc_text, para_styles['toc']), PageRef(anchor)])
+    if toc_rows:
+        story.append(Table(toc_rows, colWidths=[5.5*inch, 0.5*inch], style=pdf_styles['table']['toc']))
+    return story
+
+
+def pdf_info_flowables(para_styles):
+    """Letzte Seite: Dokumentationsinfos (ohne vorangehenden PageBreak)."""
+    story = [Spacer(1, 50)]
+    info_title_style = para_styles['info_title']
     story.append(Paragraph("Dokumentationsinformationen", info_title_style))
-    info_style = ParagraphStyle('InfoText', parent=styles['Normal'], fontSize=10, spaceAfter=12)
+    info_style = para_styles['info']
     story.append(Paragraph("<b>Generiert mit:</b>", info_style))
     story.append(Paragraph("Expertenreview gNBS App", info_style))
-    story.append(Paragraph(f"Version: {get_app_version()}", info_style))
+    story.append(Paragraph(f"Version: {APP_VERSION_LABEL}", info_style))
     story.append(Spacer(1, 20))
     story.append(Paragraph("<b>Erstellungsdatum:</b>", info_style))
     story.append(Paragraph(f"{datetime.now().strftime('%d.%m.%Y um %H:%M Uhr')}", info_style))
@@ -1248,11 +2060,178 @@ def generate_pdf():
         "das genomische Neugeborenenscreening basierend auf Expertenmeinungen.",
         info_style
     ))
-    doc.build(story, canvasmaker=PageNumCanvas)
+    return story
+
+
+PDF_HISTORY_SNIPPET = 80   # Zeichen pro Notiz-Ausschnitt im Änderungsverlauf
+
+
+def format_note_change(old, new):
+    """Notizänderung als PDF-Markup: entfernte Stellen durchgestrichen, neue fett."""
+    if not new:
+        return "Notiz gelöscht"
+    parts = []
+    for i1, i2, text in note_diff(old, new):
+        removed = old[i1:i2]
+        if removed:
+            parts.append(f"<strike>{escape_markup(removed[:PDF_HISTORY_SNIPPET])}</strike>")
+        if text:
+            parts.append(f"<b>{escape_markup(text[:PDF_HISTORY_SNIPPET])}</b>")
+    return "Notiz: " + " … ".join(parts)
+
+
+def pdf_history_rows():
+    """
+    Zeilen des Änderungsverlaufs für das PDF aus dem Protokoll der Sitzung
+    (leer ohne Sitzungsablage). Alte/neue Notizen entstehen beim Abspielen
+    der Diffs (iter_review_events).
+    """
+    store = get_session_store()
+    if store is None or not st.session_state.get('review_session_id'):
+        return []
+    rows = []
+    events = store.events(st.session_state.survey_hash, st.session_state.review_session_id)
+    for event in iter_review_events(events):
+        if event['field'] == 'attendees':
+            pair = "Anwesende"
+            change = escape_markup(', '.join(event['new']) or '–')
+        else:
+            gene, disease = event['key']
+            pair = f"<i>{escape_markup(gene)}</i> – {escape_markup(disease)}"
+            if event['field'] == 'decision':
+                change = (f"{escape_markup(pair_decision_text(event['old']) or NOT_RATED)} → "
+                          f"<b>{escape_markup(pair_decision_text(event['new']) or NOT_RATED)}</b>")
+            else:
+                change = format_note_change(event['old'], event['new'])
+        rows.append((datetime.fromtimestamp(event['time']).strftime('%d.%m.%Y %H:%M'),
+                     escape_markup(event['author']), pair, change))
+    return rows
+
+
+def pdf_closing_flowables(pdf_styles):
+    """Änderungsverlauf (falls vorhanden) und Infoseite, ohne vorangehenden PageBreak."""
+    story = []
+    history_rows = pdf_history_rows()
+    if history_rows:
+        story.extend(build_history_flowables(history_rows, pdf_styles))
+        story.append(PageBreak())
+    story.extend(pdf_info_flowables(pdf_styles['para']))
+    return story
+
+
+def use_parallel_pdf():
+    """Paralleler Export für große Paarlisten, sofern mehr als ein Worker konfiguriert ist."""
+    return PDF_WORKERS > 1 and len(st.session_state.gene_pairs) >= PDF_PARALLEL_MIN_PAIRS
+
+
+def generate_pdf(progress=None):
+    """
+    PDF-Export. PATCH: Iteration über gene_pairs (Tupel), Lookups per (gene, disease).
+
+    Große Paarlisten (use_parallel_pdf) werden blockweise in Worker-Prozessen
+    gerendert; progress(fertig, gesamt) meldet dann den Fortschritt pro Block.
+    """
+    pdf_styles    = get_pdf_styles()
+    para_styles   = pdf_styles['para']
+    gene_pairs    = st.session_state.gene_pairs
+    nbs_overlap   = reference_data['nbs_overlap'] or {}
+    creation_date = datetime.now().strftime('%d.%m.%Y')
+
+    toc_entries = []
+    for pair_idx, (gene, disease) in enumerate(gene_pairs):
+        disease_display = disease[:1].upper() + disease[1:] if disease else ''
+        toc_entries.append((f'{gene} – {disease_display}', f'pair{pair_idx}'))
+    toc_anchors = [anchor for _, anchor in toc_entries]
+
+    if use_parallel_pdf():
+        return generate_pdf_parallel(toc_entries, creation_date, progress)
+
+    pdf_buffer = io.BytesIO()
+    doc = ReviewDocTemplate(pdf_buffer, creation_date=creation_date, **PDF_PAGE_LAYOUT)
+
+    story = pdf_title_flowables(para_styles)
+    story.append(PageBreak())
+    story.extend(pdf_toc_flowables(toc_entries, pdf_styles))
+    story.append(PageBreak())
+
+    # Seiten pro Gen-Erkrankungs-Kombination
+    for pair_idx, key in enumerate(gene_pairs):
+        flowables = pair_flowables_cached(key, nbs_overlap.get(key[0], None), pdf_styles)
+        # Seitenanker am Kopf der Seite (Kopie, der Cache bleibt unverändert)
+        flowables[0].toc_entry = toc_entries[pair_idx]
+        story.extend(flowables)
+        if pair_idx < len(gene_pairs) - 1:
+            story.append(PageBreak())
+
+    story.append(PageBreak())
+    story.extend(pdf_closing_flowables(pdf_styles))
+    doc.build(story, onFirstPage=draw_page_footer, onLaterPages=draw_page_footer,
+              toc_anchors=toc_anchors)
     pdf_buffer.seek(0)
     return pdf_buffer.getvalue()
 
 
+def generate_pdf_parallel(toc_entries, creation_date, progress=None):
+    """
+    Paralleler PDF-Export: Paarseiten blockweise in Worker-Prozessen, danach
+    Titel/Inhaltsverzeichnis mit den Seitenzahlen aus den Blöcken und die
+    Infoseite als eigene Teildokumente; merge_pdf_parts() fügt alles
+    zusammen und nummeriert die Seiten. Das Inhaltsverzeichnis hat hier
+    keine Links, die Outline der Blöcke bleibt erhalten.
+    """
+    pdf_styles  = get_pdf_styles()
+    para_styles = pdf_styles['para']
+    gene_pairs  = st.session_state.gene_pairs
+    nbs_overlap = reference_data['nbs_overlap'] or {}
+
+    specs = [pair_chunk_spec(key, toc_entry, nbs_overlap.get(key[0], None))
+             for key, toc_entry in zip(gene_pairs, toc_entries)]
+    chunks = [specs[i:i + PDF_CHUNK_PAIRS] for i in range(0, len(specs), PDF_CHUNK_PAIRS)]
+    chunk_results = render_pair_chunks(chunks, creation_date, progress)
+
+    # Seite jedes Ankers relativ zum Ende von Titel + Inhaltsverzeichnis
+    appended_pages, offset = {}, 0
+    for _, page_count, anchor_pages in chunk_results:
+        for anchor, page in anchor_pages.items():
+            appended_pages[anchor] = offset + page
+        offset += page_count
+
+    front_buffer = io.BytesIO()
+    front_doc = ReviewDocTemplate(front_buffer, number_pages=False, creation_date=creation_date,
+                                  **PDF_PAGE_LAYOUT)
+    front_story = pdf_title_flowables(para_styles)
+    front_story.append(PageBreak())
+    front_story.extend(pdf_toc_flowables(toc_entries, pdf_styles, links=False))
+    front_doc.build(front_story, onFirstPage=draw_page_footer, onLaterPages=draw_page_footer,
+                    toc_anchors=[anchor for _, anchor in toc_entries],
+                    appended_pages=appended_pages)
+
+    info_buffer = io.BytesIO()
+    info_doc = ReviewDocTemplate(info_buffer, number_pages=False, creation_date=creation_date,
+                                 **PDF_PAGE_LAYOUT)
+    info_doc.build(pdf_closing_flowables(pdf_styles),
+                   onFirstPage=draw_page_footer, onLaterPages=draw_page_footer)
+
+    return merge_pdf_parts([front_buffer.getvalue(),
+                            *(pdf_bytes for pdf_bytes, _, _ in chunk_results),
+                            info_buffer.getvalue()])
+
+
+def export_state_key():
+    """Hash über alle Eingaben der Exporte, die sich während des Reviews ändern."""
+    state = (
+        st.session_state.survey_hash,
+        sorted(st.session_state.gene_decisions.items()),
+        sorted(st.session_state.user_comments.items()),
+        tuple(st.session_state.selected_attendees),
+        st.session_state.get('additional_attendees', ''),
+        st.session_state.get('selected_disease_group', ''),
+        # Änderungsverlauf im PDF: neue Protokolleinträge auch bei gleichem Endstand
+        st.session_state.shared_version,
+    )
+    return hashlib.sha256(repr(state).encode('utf-8')).hexdigest()
+
+
 # Sidebar Export
 if st.session_state.summary_df is not None and st.session_state.review_started:
     st.sidebar.markdown("### 📥 Export")
@@ -1272,18 +2251,45 @@ if st.session_state.summary_df is not None and st.session_state.review_started:
                 st.caption(f"{emoji} *{gene}* – {disease_short}")
 
     today = datetime.now().strftime("%Y%m%d")
+    state_key = export_state_key()
+
+    # CSV nur neu bauen, wenn sich der Review-Stand seit dem letzten Bau geändert hat
+    csv_cache = st.session_state.csv_cache
+    if csv_cache is None or csv_cache[0] != state_key:
+        csv_cache = st.session_state.csv_cache = (state_key, generate_csv())
     st.sidebar.download_button(
         label='📊 CSV Zusammenfassung',
-        data=generate_csv(),
+        data=csv_cache[1],
         file_name=f'gNBS_Expertenreview_Zusammenfassung_{today}.csv',
         mime='text/csv', key='download_csv', use_container_width=True
     )
-    st.sidebar.download_button(
-        label='📄 PDF Dokumentation',
-        data=generate_pdf(),
-        file_name=f'gNBS_Expertenreview_Dokumentation_{today}.pdf',
-        mime='application/pdf', key='download_pdf', use_container_width=True
-    )
+    # PDF nur auf Anforderung bauen; die Bytes bleiben gültig, solange sich
+    # Entscheidungen, Notizen, Teilnehmer und Erkrankungsgruppe nicht ändern
+    pdf_cache = st.session_state.pdf_cache
+    if pdf_cache and pdf_cache[0] == state_key:
+        st.sidebar.download_button(
+            label='📄 PDF Dokumentation',
+            data=pdf_cache[1],
+            file_name=f'gNBS_Expertenreview_Dokumentation_{today}.pdf',
+            mime='application/pdf', key='download_pdf', use_container_width=True
+        )
+    elif st.sidebar.button('📄 PDF erstellen', key='build_pdf', use_container_width=True,
+                           help='Erstellt die PDF-Dokumentation mit dem aktuellen Stand'):
+        if use_parallel_pdf():
+            progress_bar = st.sidebar.progress(0.0, text='PDF wird erstellt...')
+            def report_progress(done, total):
+                progress_bar.progress(done / total, text=f'PDF wird erstellt... ({done}/{total} Blöcke)')
+            try:
+                st.session_state.pdf_cache = (state_key, generate_pdf(progress=report_progress))
+            except RuntimeError as e:
+                progress_bar.empty()
+                st.sidebar.error(f"PDF konnte nicht erstellt werden.\n\n```\n{e}\n```")
+            else:
+                st.rerun()
+        else:
+            with st.spinner('PDF wird erstellt...'):
+                st.session_state.pdf_cache = (state_key, generate_pdf())
+            st.rerun()
 
     st.sidebar.markdown("---")
     st.sidebar.markdown(f"**Gesamt:** {st.session_state.total_responses} Responses")
@@ -1297,277 +2303,334 @@ if st.session_state.summary_df is not None and st.session_state.review_started:
 
 
 # === REVIEW TABS ===
-if st.session_state.df is not None and st.session_state.review_started:
-    df             = st.session_state.df
+if st.session_state.summary_df is not None and st.session_state.review_started:
+    comment_store  = st.session_state.comment_store
     gene_pairs     = st.session_state.gene_pairs
     gene_col_index = st.session_state.gene_col_index
+    answer_counts  = st.session_state.answer_counts
 
-    # PATCH: Tab-Labels zeigen "GENE · Erkrankung (gekürzt)"
-    def make_tab_label(gene, disease):
+    # Nur die aktive Gen-Erkrankungs-Kombination wird gerendert (Index in
+    # session_state), statt bei jedem Rerun Widgets für alle Paare aufzubauen.
+    def make_pair_label(pair_idx):
         MAX_DISEASE = 28
+        gene, disease = gene_pairs[pair_idx]
         d_short = disease[:MAX_DISEASE] + '…' if len(disease) > MAX_DISEASE else disease
-        return f"*{gene}* · {d_short}"
-
-    tabs = st.tabs([make_tab_label(g, d) for (g, d) in gene_pairs])
-
-    for tab_idx, tab in enumerate(tabs):
-        with tab:
-            gene, disease = gene_pairs[tab_idx]
-            key = (gene, disease)
-            cols = gene_col_index.get(key, {'nat_q':[], 'nat_kom':[], 'wiss_q':[], 'wiss_kom':[]})
-
-            disease_display = disease[:1].upper() + disease[1:] if disease else ''
-            overlap_group   = st.session_state.nbs_overlap.get(gene, None)
-
-            badge_html = ""
-            if overlap_group == "NBS":
-                badge_html = "<span style='background:#2196F3; color:white; padding:2px 8px; border-radius:4px; font-size:10px; font-weight:600; margin-left:8px;'>✓ NBS</span>"
-            elif overlap_group == "NGS2025":
-                badge_html = "<span style='background:#FF9800; color:white; padding:2px 8px; border-radius:4px; font-size:10px; font-weight:600; margin-left:8px;'>🔬 NGS2025</span>"
-
-            # Warnung wenn wiss-Spalten fehlen
-            if not cols['wiss_q']:
-                st.warning(f"⚠️ Keine Spalte für *Wissenschaftliche Studie* gefunden – Genname in LimeSurvey prüfen (`{gene}`).")
-
-            nav_html = f"""
-            <div style='background: linear-gradient(135deg, #e8f5e9 0%, #f1f8f4 100%);
-                        padding: 8px 12px; border-radius: 8px; border-left: 4px solid #4CAF50;
-                        box-shadow: 0 1px 3px rgba(0,0,0,0.05);
-                        font-family: "Source Sans Pro", "Segoe UI", Arial, sans-serif;'>
-                <div style='display: flex; align-items: center; gap: 10px;'>
-                    <button id="btn-prev" style='background: none; border: 1px solid #c8e6c9;
-                        border-radius: 5px; padding: 3px 9px; cursor: pointer;
-                        color: #4CAF50; font-size: 12px; line-height: 1; flex-shrink: 0;'>&#9664;</button>
-                    <div style='background: #4CAF50; color: white; padding: 4px 10px;
-                                border-radius: 5px; font-weight: 700; font-size: 13px;
-                                font-style: italic; flex-shrink: 0; white-space: nowrap;'>{gene}</div>
-                    <a href='https://omim.org/search?index=entry&search={gene}&filter=gene'
-                       target='_blank'
-                       style='flex: 1; color: #666; font-size: 13px; font-weight: 600;
-                              text-decoration: none; display: flex; align-items: center;
-                              gap: 8px; flex-wrap: wrap; line-height: 1.4;'
-                       onmouseover="this.style.textDecoration='underline'"
-                       onmouseout="this.style.textDecoration='none'">
-                       <span style='flex: 1; min-width: 200px;'>{disease_display}</span>
-                       {badge_html}
-                    </a>
-                    <div style='color: #999; font-size: 11px; font-weight: 500;
-                                flex-shrink: 0; white-space: nowrap;'>
-                        {tab_idx + 1} / {len(gene_pairs)}
-                    </div>
-                    <button id="btn-next" style='background: none; border: 1px solid #c8e6c9;
-                        border-radius: 5px; padding: 3px 9px; cursor: pointer;
-                        color: #4CAF50; font-size: 12px; line-height: 1; flex-shrink: 0;'>&#9654;</button>
-                </div>
+        return f"{pair_idx + 1}. {gene} · {d_short}"
+
+    # Nur die aktive Kombination wird gerendert, Streamlit verwirft den Zustand
+    # des Notizfelds beim Wechsel – ungespeicherte Entwürfe daher vorher merken
+    def stash_note_draft():
+        pair_idx = st.session_state.current_pair_idx
+        if not 0 <= pair_idx < len(gene_pairs):
+            return
+        key = gene_pairs[pair_idx]
+        comment_key = f'comment_input_{key[0]}_{key[1]}_{pair_idx}'
+        if comment_key not in st.session_state:
+            return
+        draft = st.session_state[comment_key]
+        if draft != st.session_state.user_comments.get(key, ''):
+            st.session_state.note_drafts[key] = draft
+        else:
+            st.session_state.note_drafts.pop(key, None)
+
+    def go_to_pair(pair_idx):
+        stash_note_draft()
+        pair_idx %= len(gene_pairs)
+        st.session_state.current_pair_idx = pair_idx
+        st.session_state.pair_select = pair_idx
+
+    def on_pair_select():
+        stash_note_draft()
+        st.session_state.current_pair_idx = st.session_state.pair_select
+
+    # Entscheidungen/Notizen per Callback speichern: Callbacks laufen vor dem
+    # Skript, sodass der Sidebar-Export bereits den aktuellen Stand sieht.
+    # Jede Änderung geht zusätzlich an die geteilte Sitzung und den Autosave
+    # (record_pair_change).
+    def set_decision(key, widget_key):
+        old = st.session_state.gene_decisions.get(key, NOT_RATED)
+        st.session_state.gene_decisions[key] = st.session_state[widget_key]
+        record_pair_change(key, 'decision', st.session_state[widget_key], old)
+
+    def save_note(key, widget_key):
+        old = st.session_state.user_comments.get(key, '')
+        st.session_state.user_comments[key] = st.session_state[widget_key]
+        st.session_state.note_drafts.pop(key, None)
+        record_pair_change(key, 'note', st.session_state[widget_key], old)
+
+    def clear_note(key, widget_key):
+        old = st.session_state.user_comments.get(key, '')
+        st.session_state.user_comments[key] = ''
+        st.session_state.note_drafts.pop(key, None)
+        del st.session_state[widget_key]
+        record_pair_change(key, 'note', '', old)
+
+    if not 0 <= st.session_state.current_pair_idx < len(gene_pairs):
+        st.session_state.current_pair_idx = 0
+    if 'pair_select' not in st.session_state:
+        st.session_state.pair_select = st.session_state.current_pair_idx
+
+    pair_idx = st.session_state.current_pair_idx
+
+    nav_prev, nav_select, nav_next = st.columns([1, 8, 1])
+    with nav_prev:
+        st.button('◀', key='pair_prev', on_click=go_to_pair, args=(pair_idx - 1,),
+                  use_container_width=True, help='Vorherige Kombination (Pfeil links)')
+    with nav_select:
+        st.selectbox('Gen-Erkrankungs-Kombination', options=range(len(gene_pairs)),
+                     format_func=make_pair_label, key='pair_select',
+                     on_change=on_pair_select, label_visibility='collapsed')
+    with nav_next:
+        st.button('▶', key='pair_next', on_click=go_to_pair, args=(pair_idx + 1,),
+                  use_container_width=True, help='Nächste Kombination (Pfeil rechts)')
+
+    gene, disease = gene_pairs[pair_idx]
+    key = (gene, disease)
+    cols = gene_col_index.get(key, {'nat_q':[], 'nat_kom':[], 'wiss_q':[], 'wiss_kom':[]})
+    counts = answer_counts.loc[key]
+
+    disease_display = disease[:1].upper() + disease[1:] if disease else ''
+    overlap_group   = (reference_data['nbs_overlap'] or {}).get(gene, None)
+
+    badge_html = ""
+    if overlap_group == "NBS":
+        badge_html = "<span style='background:#2196F3; color:white; padding:2px 8px; border-radius:4px; font-size:10px; font-weight:600; margin-left:8px;'>✓ NBS</span>"
+    elif overlap_group == "NGS2025":
+        badge_html = "<span style='background:#FF9800; color:white; padding:2px 8px; border-radius:4px; font-size:10px; font-weight:600; margin-left:8px;'>🔬 NGS2025</span>"
+
+    # Warnung wenn wiss-Spalten fehlen
+    if not cols['wiss_q']:
+        st.warning(f"⚠️ Keine Spalte für *Wissenschaftliche Studie* gefunden – Genname in LimeSurvey prüfen (`{gene}`).")
+
+    nav_html = f"""
+    <div style='background: linear-gradient(135deg, #e8f5e9 0%, #f1f8f4 100%);
+                padding: 8px 12px; border-radius: 8px; border-left: 4px solid #4CAF50;
+                box-shadow: 0 1px 3px rgba(0,0,0,0.05);
+                font-family: "Source Sans Pro", "Segoe UI", Arial, sans-serif;'>
+        <div style='display: flex; align-items: center; gap: 10px;'>
+            <button id="btn-prev" style='background: none; border: 1px solid #c8e6c9;
+                border-radius: 5px; padding: 3px 9px; cursor: pointer;
+                color: #4CAF50; font-size: 12px; line-height: 1; flex-shrink: 0;'>&#9664;</button>
+            <div style='background: #4CAF50; color: white; padding: 4px 10px;
+                        border-radius: 5px; font-weight: 700; font-size: 13px;
+                        font-style: italic; flex-shrink: 0; white-space: nowrap;'>{gene}</div>
+            <a href='https://omim.org/search?index=entry&search={gene}&filter=gene'
+               target='_blank'
+               style='flex: 1; color: #666; font-size: 13px; font-weight: 600;
+                      text-decoration: none; display: flex; align-items: center;
+                      gap: 8px; flex-wrap: wrap; line-height: 1.4;'
+               onmouseover="this.style.textDecoration='underline'"
+               onmouseout="this.style.textDecoration='none'">
+               <span style='flex: 1; min-width: 200px;'>{disease_display}</span>
+               {badge_html}
+            </a>
+            <div style='color: #999; font-size: 11px; font-weight: 500;
+                        flex-shrink: 0; white-space: nowrap;'>
+                {pair_idx + 1} / {len(gene_pairs)}
             </div>
-            <script>
-            function navTab(dir) {{
-                var doc = window.parent.document;
-                var tabs = doc.querySelectorAll('[data-baseweb="tab"]');
-                if (!tabs.length) return;
-                var active = -1;
-                tabs.forEach(function(t, i) {{
-                    if (t.getAttribute('aria-selected') === 'true') active = i;
-                }});
-                if (active === -1) return;
-                var next = (active + dir + tabs.length) % tabs.length;
-                tabs[next].click();
-                tabs[next].scrollIntoView({{behavior: 'smooth', block: 'nearest', inline: 'center'}});
-            }}
-            document.getElementById('btn-prev').addEventListener('click', function() {{ navTab(-1); }});
-            document.getElementById('btn-next').addEventListener('click', function() {{ navTab(1); }});
-            </script>
-            """
-            st.components.v1.html(nav_html, height=60)
-
-            h1, h2, h3 = st.columns([1, 1, 1])
-            with h1: st.markdown("<h4 style='margin-top:0; margin-bottom:4px;'>Nationales Screening</h4>", unsafe_allow_html=True)
-            with h2: st.markdown("<h4 style='margin-top:0; margin-bottom:4px;'>Wissenschaftliche Studie</h4>", unsafe_allow_html=True)
-            with h3: st.markdown("<h4 style='margin-top:0; margin-bottom:4px;'>Bewertung</h4>", unsafe_allow_html=True)
-
-            viz_col, comment_col = st.columns([2, 1])
-
-            with viz_col:
-                left_col, right_col = st.columns(2)
-                chart_colors = ['#ACF3AE', '#C43D5A', '#DDDDDD']
-                labels = ['Ja', 'Nein', 'NA']
-
-                with left_col:
-                    # PATCH: Spalten aus gene_col_index
-                    nat_data = df[cols['nat_q']].stack().dropna() if cols['nat_q'] else pd.Series(dtype=str)
-                    n_total  = len(nat_data)
-                    values   = [(nat_data == 'Ja').sum(),
-                                (nat_data == 'Nein').sum(),
-                                (nat_data == 'Ich kann diese Frage nicht beantworten').sum()]
-                    fig_nat = go.Figure(data=[go.Pie(
-                        labels=labels, values=values,
-                        marker=dict(colors=chart_colors),
-                        textinfo='percent', textfont_size=12, hole=0.5
-                    )])
-                    fig_nat.update_layout(height=250, margin=dict(t=0,b=0,l=0,r=0), showlegend=False)
-                    st.plotly_chart(fig_nat, use_container_width=True, key=f'nat_viz_{gene}_{disease}_{tab_idx}')
-                    ja_pct = values[0] / n_total * 100 if n_total > 0 else 0
-                    st.markdown(f"""<div style='font-size:11px; color:#555; line-height:1.4; margin-top:2px;'>
-                        <b>Gesamt:</b> n={n_total}<br>
-                        Ja: {values[0]} | Nein: {values[1]} | NA: {values[2]}<br>
-                        Cut-Off: {"✅ ≥80%" if ja_pct >= 80 else "❌ <80%"}
-                    </div>""", unsafe_allow_html=True)
-
-                with right_col:
-                    # PATCH: Spalten aus gene_col_index
-                    stud_data = df[cols['wiss_q']].stack().dropna() if cols['wiss_q'] else pd.Series(dtype=str)
-                    n_total_stud = len(stud_data)
-
-                    if n_total_stud > 0:
-                        values_stud = [(stud_data == 'Ja').sum(),
-                                       (stud_data == 'Nein').sum(),
-                                       (stud_data == 'Ich kann diese Frage nicht beantworten').sum()]
-                        fig_stud = go.Figure(data=[go.Pie(
-                            labels=labels, values=values_stud,
-                            marker=dict(colors=chart_colors),
-                            textinfo='percent', textfont_size=12, hole=0.5
-                        )])
-                        fig_stud.update_layout(height=250, margin=dict(t=0,b=0,l=0,r=0), showlegend=False)
-                        st.plotly_chart(fig_stud, use_container_width=True, key=f'stud_viz_{gene}_{disease}_{tab_idx}')
-                        ja_pct_stud = values_stud[0] / n_total_stud * 100
-                        st.markdown(f"""<div style='font-size:11px; color:#555; line-height:1.4; margin-top:2px;'>
-                            <b>Gesamt:</b> n={n_total_stud}<br>
-                            Ja: {values_stud[0]} | Nein: {values_stud[1]} | NA: {values_stud[2]}<br>
-                            Cut-Off: {"✅ ≥80%" if ja_pct_stud >= 80 else "❌ <80%"}
-                        </div>""", unsafe_allow_html=True)
-                    else:
-                        # PATCH: Klarer Hinweis statt leerem Donut
-                        st.markdown("""<div style='height:250px; display:flex; align-items:center;
-                            justify-content:center; background:#fff8f0;
-                            border:1px dashed #FFC107; border-radius:8px;'>
-                            <div style='text-align:center; color:#F57F17; font-size:12px;'>
-                                ⚠️ Keine Daten<br>
-                                <span style='font-size:10px; color:#999;'>Spalte nicht gefunden</span>
-                            </div>
-                        </div>""", unsafe_allow_html=True)
-                        st.markdown("<div style='font-size:11px; color:#aaa; line-height:1.4; margin-top:2px;'>Gesamt: n=0</div>", unsafe_allow_html=True)
-
-                st.markdown("""
-                <div style='background-color: transparent; padding: 8px; border-radius: 5px;
-                            margin-top: 10px; margin-bottom: 10px; border: 1px solid #e0e0e0;'>
-                    <span style='font-size: 12px; font-weight: 600;'>Legende:</span>
-                    <span style='background-color: #ACF3AE; padding: 2px 8px; border-radius: 3px; margin-left: 10px; font-size: 11px;'>Ja</span>
-                    <span style='background-color: #C43D5A; color: white; padding: 2px 8px; border-radius: 3px; margin-left: 5px; font-size: 11px;'>Nein</span>
-                    <span style='background-color: #DDDDDD; padding: 2px 8px; border-radius: 3px; margin-left: 5px; font-size: 11px;'>Kann ich nicht beantworten</span>
-                </div>
-                """, unsafe_allow_html=True)
-
-                # Prospective Studies (unverändert, Lookup per Genname)
-                studies = st.session_state.prospective_studies
-                study_html_parts = []
-                for s_idx, (study_name, disorder) in enumerate([
-                    ('BabyScreen+',    studies['BabyScreen+'].get(gene, None)),
-                    ('Guardian',       studies['Guardian'].get(gene, None)),
-                    ('Generation Study', studies['Generation Study'].get(gene, None)),
-                    ('Beacons',        studies['Beacons'].get(gene, None))
-                ]):
-                    if disorder:
-                        icon, color = "✓", "#4CAF50"
-                        tooltip = f"{gene}: {disorder}"
-                    else:
-                        icon, color = "✗", "#999"
-                        tooltip = f"{gene} nicht in {study_name}"
-                    tooltip_esc = tooltip.replace('"','&quot;').replace("'",'&#39;')
-                    study_html_parts.append(
-                        f"<span class='study-item study-{s_idx}' data-tooltip='{tooltip_esc}' "
-                        f"style='display:inline-block; margin-right:12px; position:relative; cursor:help;'>"
-                        f"<span style='color:{color}; font-weight:700; margin-right:3px;'>{icon}</span>"
-                        f"<span style='font-size:11px; color:#666;'>{study_name}</span></span>"
-                    )
-                st.markdown(f"""
-                    <style>
-                    .study-item::after {{
-                        content: attr(data-tooltip); position: absolute; bottom: 100%; left: 50%;
-                        transform: translateX(-50%); background: #333; color: white;
-                        padding: 6px 10px; border-radius: 4px; font-size: 11px; white-space: nowrap;
-                        opacity: 0; pointer-events: none; transition: opacity 0.2s;
-                        margin-bottom: 5px; z-index: 1000;
-                    }}
-                    .study-item:hover::after {{ opacity: 1; }}
-                    </style>
-                    <div style='background-color:#f8f9fa; padding:8px; border-radius:5px;
-                                margin-bottom:15px; border:1px solid #e0e0e0;'>
-                    <span style='font-size:12px; font-weight:600; margin-right:10px;'>Prospektive Studien:</span>
-                    {''.join(study_html_parts)}
-                    </div>""", unsafe_allow_html=True)
-
-            with comment_col:
-                st.markdown("<div style='border-left: 3px solid #4CAF50; padding-left: 15px; margin-left: 10px;'>", unsafe_allow_html=True)
-
-                decision_options = [
-                    'Noch nicht bewertet',
-                    '🟢 Aufnahme in nationales gNBS',
-                    '🟡 Aufnahme in wissenschaftliche gNBS Studie',
-                    '🔴 Keine Berücksichtigung im gNBS',
-                    '⚪ Weitere Diskussion erforderlich'
-                ]
-                # PATCH: Lookup/Speicherung per (gene, disease) Tupel
-                current_decision = st.session_state.gene_decisions.get(key, 'Noch nicht bewertet')
-                decision = st.selectbox(
-                    'Empfehlung', options=decision_options,
-                    index=decision_options.index(current_decision) if current_decision in decision_options else 0,
-                    key=f'decision_{gene}_{disease}_{tab_idx}',
-                    label_visibility='collapsed'
-                )
-                st.session_state.gene_decisions[key] = decision
-
-                st.markdown("<div style='margin-top: 15px;'></div>", unsafe_allow_html=True)
-                st.markdown("<h4 style='margin-top:0px; margin-bottom:8px; font-size:13px; color:#666;'>Zusätzliche Notizen (optional)</h4>", unsafe_allow_html=True)
-
-                # PATCH: Lookup/Speicherung per (gene, disease) Tupel
-                current_comment = st.session_state.user_comments.get(key, '')
-                user_comment = st.text_area(
-                    f"Notizen_{gene}_{disease}",
-                    value=current_comment, height=180,
-                    key=f'comment_input_{gene}_{disease}_{tab_idx}',
-                    placeholder="Hier können Sie zusätzliche Anmerkungen, Begründungen oder Diskussionspunkte dokumentieren...",
-                    label_visibility="collapsed"
-                )
-                col_save, col_clear = st.columns(2)
-                with col_save:
-                    if st.button('💾 Speichern', key=f'save_{gene}_{disease}_{tab_idx}', use_container_width=True):
-                        st.session_state.user_comments[key] = user_comment
-                with col_clear:
-                    if st.button('🗑️ Löschen', key=f'clear_{gene}_{disease}_{tab_idx}', use_container_width=True):
-                        st.session_state.user_comments[key] = ''
-
-                if st.session_state.user_comments.get(key, ''):
-                    st.caption(f'💬 Gespeichert: {len(st.session_state.user_comments[key])} Zeichen')
-
-                if decision != 'Noch nicht bewertet':
-                    st.markdown(f"""
-                    <div style='margin-top:15px; padding:10px; background-color:#f0f7f0;
-                                border-radius:6px; border-left:3px solid #4CAF50;'>
-                        <div style='font-size:11px; color:#666; margin-bottom:4px;'>Aktuelle Bewertung:</div>
-                        <div style='font-size:13px; font-weight:600; color:#333;'>{decision}</div>
-                    </div>""", unsafe_allow_html=True)
-
-                st.markdown("</div>", unsafe_allow_html=True)
-
-            st.markdown("<h4 style='font-size:17px; margin-top:20px;'>Kommentare aus Umfrage</h4>", unsafe_allow_html=True)
-            # PATCH: Spalten aus gene_col_index
-            nat_comments  = [str(c) for c in df[cols['nat_kom']].stack().dropna()  if str(c).strip()] if cols['nat_kom']  else []
-            stud_comments = [str(c) for c in df[cols['wiss_kom']].stack().dropna() if str(c).strip()] if cols['wiss_kom'] else []
-
-            c1, c2 = st.columns(2)
-            with c1:
-                st.markdown(f"**National:** ({len(nat_comments)} Kommentare)")
-                if nat_comments:
-                    with st.expander(f"Alle {len(nat_comments)} Kommentare anzeigen", expanded=True):
-                        for i, c in enumerate(nat_comments, 1):
-                            st.caption(f"{i}. {c}")
-                else:
-                    st.caption("Keine Kommentare")
-            with c2:
-                st.markdown(f"**Studie:** ({len(stud_comments)} Kommentare)")
-                if stud_comments:
-                    with st.expander(f"Alle {len(stud_comments)} Kommentare anzeigen", expanded=True):
-                        for i, c in enumerate(stud_comments, 1):
-                            st.caption(f"{i}. {c}")
+            <button id="btn-next" style='background: none; border: 1px solid #c8e6c9;
+                border-radius: 5px; padding: 3px 9px; cursor: pointer;
+                color: #4CAF50; font-size: 12px; line-height: 1; flex-shrink: 0;'>&#9654;</button>
+        </div>
+    </div>
+    <script>
+    function navPair(dir) {{
+        var doc = window.parent.document;
+        var btn = doc.querySelector(dir < 0 ? '.st-key-pair_prev button' : '.st-key-pair_next button');
+        if (btn) btn.click();
+    }}
+    document.getElementById('btn-prev').addEventListener('click', function() {{ navPair(-1); }});
+    document.getElementById('btn-next').addEventListener('click', function() {{ navPair(1); }});
+
+    // Tastatur-Navigation: Handler im Elterndokument bei jedem Rendern ersetzen
+    var parentDoc = window.parent.document;
+    if (parentDoc.gnbsKeyHandler) parentDoc.removeEventListener('keydown', parentDoc.gnbsKeyHandler);
+    parentDoc.gnbsKeyHandler = function(e) {{
+        var tag = e.target.tagName;
+        if (tag === 'INPUT' || tag === 'TEXTAREA') return;
+        if (e.key === 'ArrowLeft')  {{ e.preventDefault(); navPair(-1); }}
+        if (e.key === 'ArrowRight') {{ e.preventDefault(); navPair(1); }}
+    }};
+    parentDoc.addEventListener('keydown', parentDoc.gnbsKeyHandler);
+    </script>
+    """
+    st.components.v1.html(nav_html, height=60)
+
+    h1, h2, h3 = st.columns([1, 1, 1])
+    with h1: st.markdown("<h4 style='margin-top:0; margin-bottom:4px;'>Nationales Screening</h4>", unsafe_allow_html=True)
+    with h2: st.markdown("<h4 style='margin-top:0; margin-bottom:4px;'>Wissenschaftliche Studie</h4>", unsafe_allow_html=True)
+    with h3: st.markdown("<h4 style='margin-top:0; margin-bottom:4px;'>Bewertung</h4>", unsafe_allow_html=True)
+
+    viz_col, comment_col = st.columns([2, 1])
+
+    with viz_col:
+        left_col, right_col = st.columns(2)
+        chart_colors = ['#ACF3AE', '#C43D5A', '#DDDDDD']
+        labels = ['Ja', 'Nein', 'NA']
+
+        with left_col:
+            n_total  = int(counts['nat_n'])
+            values   = [int(counts['nat_ja']), int(counts['nat_nein']), int(counts['nat_na'])]
+            fig_nat = go.Figure(data=[go.Pie(
+                labels=labels, values=values,
+                marker=dict(colors=chart_colors),
+                textinfo='percent', textfont_size=12, hole=0.5
+            )])
+            fig_nat.update_layout(height=250, margin=dict(t=0,b=0,l=0,r=0), showlegend=False)
+            st.plotly_chart(fig_nat, use_container_width=True, key=f'nat_viz_{gene}_{disease}_{pair_idx}')
+            ja_pct = values[0] / n_total * 100 if n_total > 0 else 0
+            st.markdown(f"""<div style='font-size:11px; color:#555; line-height:1.4; margin-top:2px;'>
+                <b>Gesamt:</b> n={n_total}<br>
+                Ja: {values[0]} | Nein: {values[1]} | NA: {values[2]}<br>
+                Cut-Off: {"✅ ≥80%" if ja_pct >= 80 else "❌ <80%"}
+            </div>""", unsafe_allow_html=True)
+
+        with right_col:
+            n_total_stud = int(counts['wiss_n'])
+
+            if n_total_stud > 0:
+                values_stud = [int(counts['wiss_ja']), int(counts['wiss_nein']), int(counts['wiss_na'])]
+                fig_stud = go.Figure(data=[go.Pie(
+                    labels=labels, values=values_stud,
+                    marker=dict(colors=chart_colors),
+                    textinfo='percent', textfont_size=12, hole=0.5
+                )])
+                fig_stud.update_layout(height=250, margin=dict(t=0,b=0,l=0,r=0), showlegend=False)
+                st.plotly_chart(fig_stud, use_container_width=True, key=f'stud_viz_{gene}_{disease}_{pair_idx}')
+                ja_pct_stud = values_stud[0] / n_total_stud * 100
+                st.markdown(f"""<div style='font-size:11px; color:#555; line-height:1.4; margin-top:2px;'>
+                    <b>Gesamt:</b> n={n_total_stud}<br>
+                    Ja: {values_stud[0]} | Nein: {values_stud[1]} | NA: {values_stud[2]}<br>
+                    Cut-Off: {"✅ ≥80%" if ja_pct_stud >= 80 else "❌ <80%"}
+                </div>""", unsafe_allow_html=True)
+            else:
+                # PATCH: Klarer Hinweis statt leerem Donut
+                st.markdown("""<div style='height:250px; display:flex; align-items:center;
+                    justify-content:center; background:#fff8f0;
+                    border:1px dashed #FFC107; border-radius:8px;'>
+                    <div style='text-align:center; color:#F57F17; font-size:12px;'>
+                        ⚠️ Keine Daten<br>
+                        <span style='font-size:10px; color:#999;'>Spalte nicht gefunden</span>
+                    </div>
+                </div>""", unsafe_allow_html=True)
+                st.markdown("<div style='font-size:11px; color:#aaa; line-height:1.4; margin-top:2px;'>Gesamt: n=0</div>", unsafe_allow_html=True)
+
+        st.markdown("""
+        <div style='background-color: transparent; padding: 8px; border-radius: 5px;
+                    margin-top: 10px; margin-bottom: 10px; border: 1px solid #e0e0e0;'>
+            <span style='font-size: 12px; font-weight: 600;'>Legende:</span>
+            <span style='background-color: #ACF3AE; padding: 2px 8px; border-radius: 3px; margin-left: 10px; font-size: 11px;'>Ja</span>
+            <span style='background-color: #C43D5A; color: white; padding: 2px 8px; border-radius: 3px; margin-left: 5px; font-size: 11px;'>Nein</span>
+            <span style='background-color: #DDDDDD; padding: 2px 8px; border-radius: 3px; margin-left: 5px; font-size: 11px;'>Kann ich nicht beantworten</span>
+        </div>
+        """, unsafe_allow_html=True)
+
+        # Prospective Studies (Lookup per Genname)
+        studies = reference_data['prospective_studies']
+        study_html_parts = []
+        if studies is None:
+            study_html_parts.append("<span style='font-size:11px; color:#999;'>⏳ wird geladen…</span>")
+        else:
+            gene_studies = studies.get(gene, {})
+            for s_idx, study_name in enumerate(PROSPECTIVE_STUDIES):
+                disorder = gene_studies.get(study_name)
+                if disorder:
+                    icon, color = "✓", "#4CAF50"
+                    tooltip = f"{gene}: {disorder}"
                 else:
-                    st.caption("Keine Kommentare")
+                    icon, color = "✗", "#999"
+                    tooltip = f"{gene} nicht in {study_name}"
+                tooltip_esc = tooltip.replace('"','&quot;').replace("'",'&#39;')
+                study_html_parts.append(
+                    f"<span class='study-item study-{s_idx}' data-tooltip='{tooltip_esc}' "
+                    f"style='display:inline-block; margin-right:12px; position:relative; cursor:help;'>"
+                    f"<span style='color:{color}; font-weight:700; margin-right:3px;'>{icon}</span>"
+                    f"<span style='font-size:11px; color:#666;'>{study_name}</span></span>"
+                )
+        st.markdown(f"""
+            <style>
+            .study-item::after {{
+                content: attr(data-tooltip); position: absolute; bottom: 100%; left: 50%;
+                transform: translateX(-50%); background: #333; color: white;
+                padding: 6px 10px; border-radius: 4px; font-size: 11px; white-space: nowrap;
+                opacity: 0; pointer-events: none; transition: opacity 0.2s;
+                margin-bottom: 5px; z-index: 1000;
+            }}
+            .study-item:hover::after {{ opacity: 1; }}
+            </style>
+            <div style='background-color:#f8f9fa; padding:8px; border-radius:5px;
+                        margin-bottom:15px; border:1px solid #e0e0e0;'>
+            <span style='font-size:12px; font-weight:600; margin-right:10px;'>Prospektive Studien:</span>
+            {''.join(study_html_parts)}
+            </div>""", unsafe_allow_html=True)
+
+    with comment_col:
+        st.markdown("<div style='border-left: 3px solid #4CAF50; padding-left: 15px; margin-left: 10px;'>", unsafe_allow_html=True)
+
+        decision_options = DECISION_OPTIONS
+        # PATCH: Lookup/Speicherung per (gene, disease) Tupel
+        current_decision = st.session_state.gene_decisions.get(key, NOT_RATED)
+        decision_key = f'decision_{gene}_{disease}_{pair_idx}'
+        decision = st.selectbox(
+            'Empfehlung', options=decision_options,
+            index=decision_options.index(current_decision) if current_decision in decision_options else 0,
+            key=decision_key, on_change=set_decision, args=(key, decision_key),
+            label_visibility='collapsed'
+        )
+
+        st.markdown("<div style='margin-top: 15px;'></div>", unsafe_allow_html=True)
+        st.markdown("<h4 style='margin-top:0px; margin-bottom:8px; font-size:13px; color:#666;'>Zusätzliche Notizen (optional)</h4>", unsafe_allow_html=True)
+
+        # PATCH: Lookup/Speicherung per (gene, disease) Tupel
+        current_comment = st.session_state.user_comments.get(key, '')
+        comment_key = f'comment_input_{gene}_{disease}_{pair_idx}'
+        user_comment = st.text_area(
+            f"Notizen_{gene}_{disease}",
+            value=st.session_state.note_drafts.get(key, current_comment), height=180,
+            key=comment_key,
+            placeholder="Hier können Sie zusätzliche Anmerkungen, Begründungen oder Diskussionspunkte dokumentieren...",
+            label_visibility="collapsed"
+        )
+        col_save, col_clear = st.columns(2)
+        with col_save:
+            st.button('💾 Speichern', key=f'save_{gene}_{disease}_{pair_idx}', use_container_width=True,
+                      on_click=save_note, args=(key, comment_key))
+        with col_clear:
+            st.button('🗑️ Löschen', key=f'clear_{gene}_{disease}_{pair_idx}', use_container_width=True,
+                      on_click=clear_note, args=(key, comment_key))
+
+        if st.session_state.user_comments.get(key, ''):
+            st.caption(f'💬 Gespeichert: {len(st.session_state.user_comments[key])} Zeichen')
+
+        if decision != 'Noch nicht bewertet':
+            st.markdown(f"""
+            <div style='margin-top:15px; padding:10px; background-color:#f0f7f0;
+                        border-radius:6px; border-left:3px solid #4CAF50;'>
+                <div style='font-size:11px; color:#666; margin-bottom:4px;'>Aktuelle Bewertung:</div>
+                <div style='font-size:13px; font-weight:600; color:#333;'>{decision}</div>
+            </div>""", unsafe_allow_html=True)
+
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    st.markdown("<h4 style='font-size:17px; margin-top:20px;'>Kommentare aus Umfrage</h4>", unsafe_allow_html=True)
+    # PATCH: Spalten aus gene_col_index
+    nat_comments  = comment_store[key]['nat']
+    stud_comments = comment_store[key]['stud']
+
+    c1, c2 = st.columns(2)
+    with c1:
+        st.markdown(f"**National:** ({len(nat_comments)} Kommentare)")
+        if nat_comments:
+            with st.expander(f"Alle {len(nat_comments)} Kommentare anzeigen", expanded=True):
+                for i, c in enumerate(nat_comments, 1):
+                    st.caption(f"{i}. {c}")
+        else:
+            st.caption("Keine Kommentare")
+    with c2:
+        st.markdown(f"**Studie:** ({len(stud_comments)} Kommentare)")
+        if stud_comments:
+            with st.expander(f"Alle {len(stud_comments)} Kommentare anzeigen", expanded=True):
+                for i, c in enumerate(stud_comments, 1):
+                    st.caption(f"{i}. {c}")
+        else:
+            st.caption("Keine Kommentare")
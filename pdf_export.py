@@ -0,0 +1,577 @@
+"""
+PDF-Rendering des Expertenreviews (ReportLab), ohne Streamlit-Abhängigkeit.
+
+Das Modul wird von app.py importiert und beim parallelen PDF-Export als
+eigenständiges Skript pro Block gestartet (python pdf_export.py); alles hier
+muss daher ohne session_state auskommen und picklebare Ein- und Ausgaben
+haben.
+"""
+
+import io
+import os
+import pickle
+import sys
+from datetime import datetime
+
+from pypdf import PdfReader, PdfWriter
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen import canvas
+from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table,
+                                TableStyle, HRFlowable, Flowable)
+
+
+def escape_markup(text):
+    """Escaped &, < und > für ReportLab-Paragraph-Markup."""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+# Farben der PDF-Boxen: (Hintergrund, Text) bzw. Hintergrund
+PDF_RESULT_COLORS = {
+    'national': ('#E8F5E9', '#2E7D32'),
+    'studie':   ('#FFF8E1', '#F57F17'),
+    'keine':    ('#FFEBEE', '#C62828'),
+}
+PDF_DECISION_COLORS = {
+    'national':   '#4CAF50',
+    'studie':     '#FFC107',
+    'keine':      '#F44336',
+    'diskussion': '#9E9E9E',
+}
+PDF_BADGE_COLORS = {'NBS': '#2196F3', 'NGS2025': '#FF9800'}
+PDF_COMMENT_COLORS = {
+    'National': ('#EAF4EA', '#2E7D32'),
+    'Studie':   ('#FFF8E1', '#F57F17'),
+}
+
+
+def build_pdf_styles():
+    """
+    ParagraphStyle- und TableStyle-Registry des PDF-Exports. Wird einmal pro
+    Prozess gebaut (in der App über get_pdf_styles); Styles sind
+    unveränderlich in Gebrauch und werden von allen Tabellen/Absätzen aller
+    Sessions geteilt.
+
+    Gibt ein dict mit 'para' (Name -> ParagraphStyle) und 'table'
+    (Name -> TableStyle) zurück.
+    """
+    base = getSampleStyleSheet()
+    para = {
+        'normal':   base['Normal'],
+        'heading3': base['Heading3'],
+        'title':    ParagraphStyle('CustomTitle',  parent=base['Heading1'],
+                                   fontSize=18, textColor=colors.HexColor('#1f77b4'),
+                                   spaceAfter=20, alignment=TA_CENTER),
+        'gene':     ParagraphStyle('GeneName',     parent=base['Heading2'],
+                                   fontSize=14, textColor=colors.HexColor('#2ca02c'),
+                                   spaceAfter=6, spaceBefore=12),
+        'disease':  ParagraphStyle('DiseaseName',  parent=base['Normal'],
+                                   fontSize=11, textColor=colors.grey,
+                                   spaceAfter=12, italic=True),
+        'section':  ParagraphStyle('SectionHeader',parent=base['Heading3'],
+                                   fontSize=12, textColor=colors.HexColor('#333333'),
+                                   spaceAfter=8, spaceBefore=10),
+        'comment':  ParagraphStyle('CommentText',  parent=base['Normal'],
+                                   fontSize=9, leftIndent=20, spaceAfter=6),
+        'toc':      ParagraphStyle('TOCEntry',     parent=base['Normal'],
+                                   fontSize=10, leftIndent=20, spaceAfter=6,
+                                   textColor=colors.HexColor('#1f77b4')),
+        'badge':    ParagraphStyle('BadgeText', alignment=1),
+        'clabel':   {label: ParagraphStyle('CLabel', fontSize=8,
+                                           textColor=colors.HexColor(label_color),
+                                           fontName='Helvetica-Bold')
+                     for label, (_, label_color) in PDF_COMMENT_COLORS.items()},
+        'ctext':    ParagraphStyle('CText', fontSize=8, leading=11, leftIndent=8),
+        'note':     ParagraphStyle('NoteText', fontSize=8, leading=12, leftIndent=4),
+        'info_title': ParagraphStyle('InfoTitle', parent=base['Heading1'],
+                                     fontSize=16, textColor=colors.HexColor('#1f77b4'),
+                                     spaceAfter=30, alignment=TA_CENTER),
+        'info':     ParagraphStyle('InfoText', parent=base['Normal'], fontSize=10, spaceAfter=12),
+        'history':  ParagraphStyle('HistoryText', fontSize=7, leading=9),
+    }
+
+    table = {
+        'toc': TableStyle([
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME',  (1, 0), (1, -1), 'Helvetica'),
+            ('FONTSIZE',  (1, 0), (1, -1), 10),
+            ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#1f77b4')),
+        ]),
+        'header': TableStyle([
+            ('ALIGN',  (0,0),(0,0), 'LEFT'),
+            ('ALIGN',  (1,0),(1,0), 'RIGHT'),
+            ('VALIGN', (0,0),(-1,-1), 'TOP'),
+        ]),
+        'stats': TableStyle([
+            ('BACKGROUND', (0,0),(-1,0), colors.HexColor('#f0f0f0')),
+            ('ALIGN',      (0,0),(-1,-1), 'CENTER'),
+            ('FONTNAME',   (0,0),(-1,0), 'Helvetica-Bold'),
+            ('FONTSIZE',   (0,0),(-1,0), 10),
+            ('FONTSIZE',   (0,1),(-1,-1), 9),
+            ('BOTTOMPADDING', (0,0),(-1,0), 8),
+            ('BACKGROUND', (0,1),(0,-1), colors.HexColor('#fafafa')),
+            ('GRID',       (0,0),(-1,-1), 0.5, colors.grey),
+            ('ROWBACKGROUNDS', (1,1),(-1,-2), [colors.white, colors.HexColor('#f9f9f9')]),
+        ]),
+        'undecided': TableStyle([
+            ('BACKGROUND', (0,0),(-1,-1), colors.HexColor('#F5F5F5')),
+            ('TEXTCOLOR',  (0,0),(-1,-1), colors.HexColor('#999999')),
+            ('ALIGN',      (0,0),(-1,-1), 'CENTER'),
+            ('FONTNAME',   (0,0),(-1,-1), 'Helvetica'),
+            ('FONTSIZE',   (0,0),(-1,-1), 10),
+            ('TOPPADDING', (0,0),(-1,-1), 8),
+            ('BOTTOMPADDING',(0,0),(-1,-1), 8),
+        ]),
+        'note': TableStyle([
+            ('BACKGROUND',   (0,0),(-1,-1), colors.HexColor('#F0F4FF')),
+            ('TOPPADDING',   (0,0),(-1,-1), 8),
+            ('BOTTOMPADDING',(0,0),(-1,-1), 8),
+            ('LEFTPADDING',  (0,0),(-1,-1), 10),
+            ('RIGHTPADDING', (0,0),(-1,-1), 10),
+        ]),
+        'history': TableStyle([
+            ('BACKGROUND', (0,0),(-1,0), colors.HexColor('#f0f0f0')),
+            ('VALIGN',     (0,0),(-1,-1), 'TOP'),
+            ('LINEBELOW',  (0,0),(-1,-1), 0.25, colors.HexColor('#dddddd')),
+            ('TOPPADDING', (0,0),(-1,-1), 2),
+            ('BOTTOMPADDING',(0,0),(-1,-1), 2),
+        ]),
+    }
+    for name, badge_color in PDF_BADGE_COLORS.items():
+        table[f'badge_{name}'] = TableStyle([
+            ('BACKGROUND',   (0,0),(-1,-1), colors.HexColor(badge_color)),
+            ('TEXTCOLOR',    (0,0),(-1,-1), colors.white),
+            ('ALIGN',        (0,0),(-1,-1), 'CENTER'),
+            ('VALIGN',       (0,0),(-1,-1), 'MIDDLE'),
+            ('TOPPADDING',   (0,0),(-1,-1), 4),
+            ('BOTTOMPADDING',(0,0),(-1,-1), 4),
+            ('LEFTPADDING',  (0,0),(-1,-1), 8),
+            ('RIGHTPADDING', (0,0),(-1,-1), 8),
+            ('ROUNDEDCORNERS', [4,4,4,4]),
+        ])
+    for name, (result_color, text_color) in PDF_RESULT_COLORS.items():
+        table[f'result_{name}'] = TableStyle([
+            ('BACKGROUND', (0,0),(-1,-1), colors.HexColor(result_color)),
+            ('TEXTCOLOR',  (0,0),(-1,-1), colors.HexColor(text_color)),
+            ('ALIGN',      (0,0),(-1,-1), 'CENTER'),
+            ('FONTNAME',   (0,0),(-1,-1), 'Helvetica-Bold'),
+            ('FONTSIZE',   (0,0),(-1,-1), 10),
+            ('TOPPADDING', (0,0),(-1,-1), 8),
+            ('BOTTOMPADDING',(0,0),(-1,-1), 8),
+        ])
+    for name, box_color in PDF_DECISION_COLORS.items():
+        table[f'decision_{name}'] = TableStyle([
+            ('BACKGROUND',   (0,0),(-1,-1), colors.HexColor(box_color)),
+            ('TEXTCOLOR',    (0,0),(-1,-1), colors.white),
+            ('ALIGN',        (0,0),(-1,-1), 'CENTER'),
+            ('FONTNAME',     (0,0),(-1,-1), 'Helvetica-Bold'),
+            ('FONTSIZE',     (0,0),(-1,-1), 11),
+            ('TOPPADDING',   (0,0),(-1,-1), 10),
+            ('BOTTOMPADDING',(0,0),(-1,-1), 10),
+        ])
+    for label, (bg_color, _) in PDF_COMMENT_COLORS.items():
+        table[f'comment_{label}'] = TableStyle([
+            ('BACKGROUND',   (0,0),(-1,-1), colors.HexColor(bg_color)),
+            ('TOPPADDING',   (0,0),(-1,-1), 5),
+            ('BOTTOMPADDING',(0,0),(-1,-1), 5),
+            ('LEFTPADDING',  (0,0),(-1,-1), 10),
+            ('RIGHTPADDING', (0,0),(-1,-1), 10),
+        ])
+    return {'para': para, 'table': table}
+
+
+def make_comment_table(label, comment_list, pdf_styles):
+    """Kommentarblock (National/Studie) mit bereits escapten Kommentaren."""
+    para = pdf_styles['para']
+    rows = [[Paragraph(f"<b>{label}</b>", para['clabel'][label])]]
+    for safe in comment_list:
+        rows.append([Paragraph(f"• {safe}", para['ctext'])])
+    ct = Table(rows, colWidths=[5.3*inch])
+    ct.setStyle(pdf_styles['table'][f'comment_{label}'])
+    return ct
+
+
+def build_history_flowables(rows, pdf_styles):
+    """
+    Änderungsverlauf als Tabelle (ohne vorangehenden PageBreak).
+    rows: (Zeit, Von, Kombination, Änderung) als bereits escapter Markup-Text.
+    """
+    para = pdf_styles['para']
+    story = [Paragraph("Änderungsverlauf", para['title'])]
+    header = [Paragraph(f"<b>{label}</b>", para['history'])
+              for label in ('Zeit', 'Von', 'Kombination', 'Änderung')]
+    table_rows = [header] + [[Paragraph(cell, para['history']) for cell in row] for row in rows]
+    story.append(Table(table_rows, colWidths=[0.9*inch, 0.9*inch, 1.8*inch, 3.0*inch],
+                       style=pdf_styles['table']['history'], repeatRows=1))
+    return story
+
+
+def build_pair_flowables(gene, disease, counts, comments, overlap_group,
+                         decision_text, reviewer_comment, pdf_styles):
+    """
+    Flowables der Seite einer (gene, disease) Kombination: Kopf mit Badge,
+    Antworttabelle, Ergebnis-Box, Kommentare, Entscheidung und Notizen
+    (ohne abschließenden PageBreak).
+
+    counts ist die Zeile des Paares aus answer_counts (oder ein dict mit
+    denselben Schlüsseln), comments der Eintrag aus dem comment_store,
+    decision_text die Entscheidung ohne Emoji (None = noch nicht bewertet).
+    Die Funktion liest keinen session_state.
+    """
+    para_styles   = pdf_styles['para']
+    table_styles  = pdf_styles['table']
+    gene_style    = para_styles['gene']
+    disease_style = para_styles['disease']
+    section_style = para_styles['section']
+    comment_style = para_styles['comment']
+
+    flowables = []
+    disease_display = disease[:1].upper() + disease[1:] if disease else ''
+    header_left = Paragraph(f"<b><i>{gene}</i></b>", gene_style)
+
+    if overlap_group == "NBS":
+        badge_text = "✓ Im NBS"
+    elif overlap_group == "NGS2025":
+        badge_text = "✓ NGS2025"
+    else:
+        badge_text = None
+
+    if badge_text:
+        badge_para  = Paragraph(f"<font color='white' size='9'><b>{badge_text}</b></font>",
+                                para_styles['badge'])
+        badge_table = Table([[badge_para]], colWidths=[0.9*inch])
+        badge_table.setStyle(table_styles[f'badge_{overlap_group}'])
+        header_right = badge_table
+    else:
+        header_right = ''
+
+    header_table = Table([[header_left, header_right]], colWidths=[4.6*inch, 1.4*inch])
+    header_table.setStyle(table_styles['header'])
+    flowables.append(header_table)
+    flowables.append(Paragraph(disease_display, disease_style))
+    flowables.append(Spacer(1, 6))
+
+    nat_ja    = counts['nat_ja']
+    nat_nein  = counts['nat_nein']
+    nat_na    = counts['nat_na']
+    nat_total = counts['nat_n']
+    nat_ja_pct   = nat_ja   / nat_total  * 100 if nat_total  > 0 else 0
+
+    stud_ja   = counts['wiss_ja']
+    stud_nein = counts['wiss_nein']
+    stud_na   = counts['wiss_na']
+    stud_total = counts['wiss_n']
+    stud_ja_pct  = stud_ja  / stud_total * 100 if stud_total > 0 else 0
+
+    nat_ja_pct_str  = f'{nat_ja}  ({nat_ja_pct:.1f}%)'
+    nat_nei_str     = f'{nat_nein} ({(nat_nein/nat_total*100) if nat_total else 0:.1f}%)'
+    nat_na_str      = f'{nat_na}   ({(nat_na/nat_total*100)   if nat_total else 0:.1f}%)'
+    stud_ja_pct_str = f'{stud_ja}  ({stud_ja_pct:.1f}%)'  if stud_total else 'n/a'
+    stud_nei_str    = f'{stud_nein} ({(stud_nein/stud_total*100) if stud_total else 0:.1f}%)' if stud_total else 'n/a'
+    stud_na_str     = f'{stud_na}   ({(stud_na/stud_total*100)   if stud_total else 0:.1f}%)' if stud_total else 'n/a'
+
+    data = [
+        ['', 'Nationales Screening', 'Wissenschaftliche Studie'],
+        ['Ja',                  nat_ja_pct_str,  stud_ja_pct_str],
+        ['Nein',                nat_nei_str,     stud_nei_str],
+        ['Kann nicht beantworten', nat_na_str,   stud_na_str],
+        ['Gesamt',              f'n={nat_total}', f'n={stud_total}' if stud_total else 'n/a'],
+        ['Cut-Off (≥80%)',      '✓' if nat_ja_pct >= 80 else '✗',
+                                '✓' if stud_ja_pct >= 80 else ('–' if not stud_total else '✗')]
+    ]
+    t = Table(data, colWidths=[2.2*inch, 2*inch, 2*inch])
+    t.setStyle(table_styles['stats'])
+    flowables.append(t)
+    flowables.append(Spacer(1, 15))
+
+    # Ergebnis-Box
+    flowables.append(Paragraph("<b>Ergebnis der Umfrage:</b>", section_style))
+    if nat_ja_pct >= 80:
+        result_kind, result_text = 'national', "≥80% Zustimmung für nationales gNBS"
+    elif stud_ja_pct >= 80:
+        result_kind, result_text = 'studie', "≥80% Zustimmung für wissenschaftliche Studie"
+    else:
+        result_kind, result_text = 'keine', "<80% Zustimmung für Berücksichtigung im gNBS"
+
+    rt = Table([[result_text]], colWidths=[5.5*inch])
+    rt.setStyle(table_styles[f'result_{result_kind}'])
+    flowables.append(rt)
+    flowables.append(Spacer(1, 10))
+
+    # Kommentare (bereinigt aus dem comment_store)
+    flowables.append(Paragraph("<b>Kommentare aus der Umfrage:</b>", section_style))
+    nat_comments  = comments['nat_markup']
+    stud_comments = comments['stud_markup']
+
+    if nat_comments:
+        flowables.append(make_comment_table("National", nat_comments, pdf_styles))
+        flowables.append(Spacer(1, 6))
+    if stud_comments:
+        flowables.append(make_comment_table("Studie", stud_comments, pdf_styles))
+        flowables.append(Spacer(1, 6))
+    if not nat_comments and not stud_comments:
+        flowables.append(Paragraph("Keine Kommentare", comment_style))
+        flowables.append(Spacer(1, 6))
+
+    flowables.append(Spacer(1, 15))
+    flowables.append(HRFlowable(width="100%", thickness=1, color=colors.grey, spaceAfter=15))
+
+    # Entscheidung
+    flowables.append(Paragraph("<b>Entscheidung der Expertengruppe:</b>", section_style))
+
+    if decision_text:
+        if 'nationales gNBS'    in decision_text: box_kind = 'national'
+        elif 'wissenschaftliche' in decision_text: box_kind = 'studie'
+        elif 'Keine'            in decision_text: box_kind = 'keine'
+        else:                                 box_kind = 'diskussion'
+        dt = Table([[decision_text]], colWidths=[5.5*inch])
+        dt.setStyle(table_styles[f'decision_{box_kind}'])
+        flowables.append(dt)
+    else:
+        nd = Table([["Noch nicht bewertet"]], colWidths=[5.5*inch])
+        nd.setStyle(table_styles['undecided'])
+        flowables.append(nd)
+
+    flowables.append(Spacer(1, 10))
+
+    # Notizen
+    if reviewer_comment:
+        flowables.append(Paragraph("<b>Zusätzliche Notizen:</b>", section_style))
+        safe_rc = escape_markup(reviewer_comment)
+        nt = Table([[Paragraph(safe_rc.replace('\n','<br/>'), para_styles['note'])]],
+                   colWidths=[5.3*inch])
+        nt.setStyle(table_styles['note'])
+        flowables.append(nt)
+        flowables.append(Spacer(1, 10))
+
+    flowables.append(Spacer(1, 5))
+    flowables.append(HRFlowable(width="100%", thickness=1, color=colors.grey, spaceAfter=10))
+    return flowables
+
+
+# Seitenformat und Ränder aller Teildokumente des PDF-Exports
+PDF_PAGE_LAYOUT = dict(pagesize=A4,
+                       topMargin=0.75*inch, bottomMargin=0.75*inch,
+                       leftMargin=0.75*inch, rightMargin=0.75*inch)
+
+# Logo der Fußzeile: relativ zum Modul (unabhängig vom Arbeitsverzeichnis),
+# einmal beim Import aufgelöst; None, wenn die Datei fehlt
+FOOTER_LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uk_akro.jpg')
+if not os.path.exists(FOOTER_LOGO_PATH):
+    FOOTER_LOGO_PATH = None
+
+
+def page_label_x(page_num):
+    """x-Position von "Seite X von Y" in der Fußzeile (zentriert mit Y ≈ X)."""
+    page_text_width = pdfmetrics.stringWidth(f"Seite {page_num} von {page_num}", 'Helvetica', 8)
+    return max((A4[0] - page_text_width) / 2, 0.75*inch + 100)
+
+
+def draw_page_footer(canv, doc):
+    """
+    Fußzeile jeder PDF-Seite: Erstellungsdatum, "Seite X von Y", Logo.
+    Y und das Logo sind Form-XObjects, die ReviewDocTemplate nach dem Layout
+    einmal pro Dokument anlegt. Bei Teildokumenten (doc.number_pages False)
+    entfällt die Seitenangabe; sie kommt beim Zusammenführen dazu.
+    """
+    canv.saveState()
+    canv.setStrokeColor(colors.grey)
+    canv.setLineWidth(0.5)
+    canv.line(0.75*inch, 0.5*inch, A4[0] - 0.75*inch, 0.5*inch)
+    canv.setFont('Helvetica', 8)
+    canv.setFillColor(colors.grey)
+    canv.drawString(0.75*inch, 0.35*inch, f"Erstellt am: {doc.creation_date}")
+    if doc.number_pages:
+        page_num = canv.getPageNumber()
+        page_text = f"Seite {page_num} von "
+        center_x = page_label_x(page_num)
+        canv.drawString(center_x, 0.35*inch, page_text)
+        canv.saveState()
+        canv.translate(center_x + canv.stringWidth(page_text, 'Helvetica', 8), 0.35*inch)
+        canv.doForm('page_total')
+        canv.restoreState()
+    if FOOTER_LOGO_PATH:
+        canv.doForm('footer_logo')
+    canv.restoreState()
+
+
+def define_footer_logo(canv):
+    """
+    Legt das Form-XObject 'footer_logo' an: das Bild wird einmal pro Dokument
+    eingebettet, jede Fußzeile zeichnet nur noch das Form. Ist das Bild nicht
+    lesbar, bleibt das Form leer.
+    """
+    canv.beginForm('footer_logo')
+    try:
+        logo_height = 0.4*inch
+        logo_width  = logo_height * 2
+        canv.drawImage(FOOTER_LOGO_PATH, A4[0] - 0.5*inch - logo_width, 0.25*inch,
+                       width=logo_width, height=logo_height,
+                       preserveAspectRatio=True, mask='auto')
+    except Exception:
+        pass
+    canv.endForm()
+
+
+class PageRef(Flowable):
+    """
+    Seitenzahl eines Seitenankers im Inhaltsverzeichnis. Gezeichnet wird ein
+    Form-XObject, das ReviewDocTemplate nach dem Layout mit der echten
+    Seitenzahl füllt (Vorwärtsreferenz, kein zweiter Durchlauf nötig).
+    """
+
+    width, height = 0.4*inch, 10
+
+    def __init__(self, anchor):
+        Flowable.__init__(self)
+        self.anchor = anchor
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.doForm(f'toc_page_{self.anchor}')
+
+
+class ReviewDocTemplate(SimpleDocTemplate):
+    """
+    Dokumentvorlage des PDF-Exports, Layout in einem Durchlauf:
+
+    - Flowables mit Attribut toc_entry = (Outline-Titel, Anker) setzen beim
+      Platzieren einen Seitenanker samt PDF-Outline-Eintrag und merken sich
+      die tatsächliche Seite.
+    - Nach dem Layout werden die Form-XObjects für die Gesamtseitenzahl und
+      das Logo der Fußzeile sowie die Seitenzahlen im Inhaltsverzeichnis
+      (PageRef) angelegt, dann wird gespeichert.
+      Seiteninhalte werden dafür nicht im Speicher gehalten.
+
+    number_pages=False erzeugt ein Teildokument für merge_pdf_parts() ohne
+    Seitenangabe in der Fußzeile.
+    """
+
+    def __init__(self, *args, number_pages=True, creation_date=None, **kwargs):
+        SimpleDocTemplate.__init__(self, *args, **kwargs)
+        self.creation_date = creation_date or datetime.now().strftime('%d.%m.%Y')
+        self.number_pages = number_pages
+        self.anchor_pages = {}
+        self.page_count = 0
+
+    def afterFlowable(self, flowable):
+        entry = getattr(flowable, 'toc_entry', None)
+        if entry:
+            outline_title, anchor = entry
+            self.canv.bookmarkPage(anchor)
+            self.canv.addOutlineEntry(outline_title, anchor, level=0)
+            self.anchor_pages[anchor] = self.page
+
+    def build(self, flowables, toc_anchors=(), appended_pages=None, **kwargs):
+        """
+        appended_pages: Anker -> Seite relativ zum Ende dieses Dokuments, für
+        ein Inhaltsverzeichnis, dessen Paarseiten erst beim Zusammenführen
+        angehängt werden.
+        """
+        self._doSave = 0
+        SimpleDocTemplate.build(self, flowables, **kwargs)
+        canv = self.canv
+        self.page_count = canv.getPageNumber() - 1
+        if self.number_pages:
+            canv.beginForm('page_total')
+            canv.setFont('Helvetica', 8)
+            canv.setFillColor(colors.grey)
+            canv.drawString(0, 0, str(self.page_count))
+            canv.endForm()
+        if FOOTER_LOGO_PATH:
+            define_footer_logo(canv)
+        for anchor in toc_anchors:
+            if appended_pages is not None:
+                page = self.page_count + appended_pages[anchor]
+            else:
+                page = self.anchor_pages.get(anchor, '–')
+            canv.beginForm(f'toc_page_{anchor}')
+            canv.setFont('Helvetica', 10)
+            canv.setFillColor(colors.HexColor('#1f77b4'))
+            canv.drawRightString(PageRef.width, 2, str(page))
+            canv.endForm()
+        canv.save()
+
+
+# ---------------------------------------------------------------------------
+# Paralleler Export: Paarseiten in Blöcken, Zusammenführen mit pypdf
+# ---------------------------------------------------------------------------
+
+def render_pair_chunk(pair_specs, creation_date):
+    """
+    Rendert einen Block von Paarseiten als eigenständiges PDF (läuft im
+    Worker-Prozess, siehe main()). pair_specs ist eine Liste von Tupeln
+    (toc_entry, gene, disease, counts, comments, overlap_group,
+    decision_text, reviewer_comment) mit picklebaren Werten.
+
+    Gibt (pdf_bytes, Seitenzahl, Anker -> Seite im Block) zurück.
+    """
+    pdf_styles = build_pdf_styles()
+    story = []
+    for spec_idx, (toc_entry, *pair_args) in enumerate(pair_specs):
+        flowables = build_pair_flowables(*pair_args, pdf_styles)
+        flowables[0].toc_entry = toc_entry
+        story.extend(flowables)
+        if spec_idx < len(pair_specs) - 1:
+            story.append(PageBreak())
+
+    pdf_buffer = io.BytesIO()
+    doc = ReviewDocTemplate(pdf_buffer, number_pages=False, creation_date=creation_date,
+                            **PDF_PAGE_LAYOUT)
+    doc.build(story, onFirstPage=draw_page_footer, onLaterPages=draw_page_footer)
+    return pdf_buffer.getvalue(), doc.page_count, doc.anchor_pages
+
+
+def merge_pdf_parts(parts):
+    """
+    Hängt Teildokumente (Bytes, in Reihenfolge) aneinander und ergänzt die
+    Fußzeile jeder Seite um "Seite X von Y". Outline-Einträge der Teile
+    bleiben erhalten, identische Objekte (Logo) werden zusammengelegt.
+    """
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(PdfReader(io.BytesIO(part)))
+
+    total_pages = len(writer.pages)
+    overlay_buffer = io.BytesIO()
+    overlay = canvas.Canvas(overlay_buffer, pagesize=A4)
+    for page_num in range(1, total_pages + 1):
+        overlay.setFont('Helvetica', 8)
+        overlay.setFillColor(colors.grey)
+        overlay.drawString(page_label_x(page_num), 0.35*inch,
+                           f"Seite {page_num} von {total_pages}")
+        overlay.showPage()
+    overlay.save()
+
+    for page, label_page in zip(writer.pages, PdfReader(overlay_buffer).pages):
+        page.merge_page(label_page)
+        page.compress_content_streams()
+    # Jedes Teildokument bringt eigene Kopien von Logo-Bild und Fußzeilen-Form
+    # mit; gleiche Objekte nur einmal ablegen
+    writer.compress_identical_objects()
+
+    pdf_buffer = io.BytesIO()
+    writer.write(pdf_buffer)
+    return pdf_buffer.getvalue()
+
+
+def main():
+    """
+    Worker des parallelen Exports: liest (pair_specs, creation_date) als
+    Pickle von stdin und schreibt das Ergebnis von render_pair_chunk() als
+    Pickle nach stdout.
+    """
+    pair_specs, creation_date = pickle.load(sys.stdin.buffer)
+    pickle.dump(render_pair_chunk(pair_specs, creation_date), sys.stdout.buffer)
+
+
+if __name__ == '__main__':
+    main()
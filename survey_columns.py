@@ -0,0 +1,191 @@
+"""
+Spalten der LimeSurvey-Umfrage, ohne Streamlit-Abhängigkeit: Gen und
+Erkrankung aus den Spaltenheadern lesen und nationale mit wissenschaftlichen
+Fragen zuordnen (build_gene_col_index).
+
+Wird von app.py importiert; tests/test_gene_col_index.py vergleicht die
+Zuordnung mit der früheren paarweisen Implementierung.
+"""
+
+import bisect
+import re
+
+import pandas as pd
+
+
+# LimeSurvey-Header: "...  Gen: <GEN>  Erkrankung: <ERKRANKUNG> [Kommentar]"
+# Die Erkrankung endet vor " [" oder einem doppelten Leerzeichen.
+HEADER_PAIR_RE = re.compile(
+    r'Gen:[ \xa0\t]*(?P<gene>.*?)Erkrankung:[ \xa0\t]*(?P<disease>.*?)(?: \[|  |\Z)',
+    re.DOTALL
+)
+HEADER_TRACK_RE = re.compile(r'(?P<nat>nationalen)|(?P<wiss>wissenschaftlicher)')
+
+HEADER_TABLE_COLUMNS = ['column', 'track', 'gene', 'disease', 'is_comment']
+
+
+def extract_gene_disease_from_col(col):
+    """
+    Extrahiert (gene, disease) aus einem LimeSurvey-Spaltenheader.
+    Gibt (None, None) zurück wenn das Format nicht erkannt wird.
+    """
+    match = HEADER_PAIR_RE.search(col)
+    if not match:
+        return None, None
+    return (match.group('gene').strip(' \xa0\t'),
+            match.group('disease').strip(' \xa0\t'))
+
+
+def parse_headers(columns):
+    """
+    Klassifiziert alle Spaltenheader in einem Durchgang.
+
+    Gibt einen DataFrame mit einer Zeile pro Spalte zurück:
+        column      – Original-Header
+        track       – 'nat', 'wiss' oder None (keine Gen-Frage)
+        gene        – Genname oder None
+        disease     – Erkrankung oder None
+        is_comment  – True für '[Kommentar]'-Spalten
+    Der Track ergibt sich aus dem ersten Vorkommen von 'nationalen' bzw.
+    'wissenschaftlicher' im Header.
+    """
+    rows = []
+    for col in columns:
+        col = str(col)
+        track_match = HEADER_TRACK_RE.search(col)
+        gene, disease = extract_gene_disease_from_col(col)
+        if track_match and gene:
+            track = track_match.lastgroup
+        else:
+            track, gene, disease = None, None, None
+        rows.append((col, track, gene, disease, '[Kommentar]' in col))
+    return pd.DataFrame(rows, columns=HEADER_TABLE_COLUMNS)
+
+
+def genes_compatible(g1, g2):
+    """
+    True wenn zwei Gennamen als identisch gewertet werden sollen.
+    Behandelt den Fall dass LimeSurvey in national vs. wissenschaftlich
+    leicht abweichende Schreibweisen hat (z.B. BCL11 vs BCL11B, CD79A vs CD79).
+    Beide Richtungen werden geprüft (Prefix-Match).
+    """
+    if g1 == g2:
+        return True
+    longer, shorter = (g1, g2) if len(g1) > len(g2) else (g2, g1)
+    return longer.startswith(shorter)
+
+
+def index_wiss_entries(wiss_raw):
+    """
+    Index der wissenschaftlichen Spalten für build_gene_col_index().
+
+    Gibt zurück:
+        wiss_by_gene      – dict gene -> [(order, gene, disease_norm, cols), ...]
+        wiss_genes_sorted – sortierte Liste aller wiss-Gennamen (für Prefix-Suche)
+    """
+    wiss_by_gene = {}
+    for order, ((wiss_gene, wiss_disease), wiss_cols) in enumerate(wiss_raw.items()):
+        wiss_by_gene.setdefault(wiss_gene, []).append(
+            (order, wiss_gene, wiss_disease.lower().strip(), wiss_cols)
+        )
+    return wiss_by_gene, sorted(wiss_by_gene)
+
+
+def compatible_wiss_entries(nat_gene, wiss_by_gene, wiss_genes_sorted):
+    """
+    Alle wiss-Einträge, deren Gen laut genes_compatible() zu nat_gene passt:
+    identische Gene und Präfixe von nat_gene per Hash-Lookup, längere Gene
+    mit nat_gene als Präfix per Binärsuche in der sortierten Liste.
+    """
+    entries = []
+    for end in range(1, len(nat_gene) + 1):
+        entries.extend(wiss_by_gene.get(nat_gene[:end], ()))
+    pos = bisect.bisect_right(wiss_genes_sorted, nat_gene)
+    while pos < len(wiss_genes_sorted) and wiss_genes_sorted[pos].startswith(nat_gene):
+        entries.extend(wiss_by_gene[wiss_genes_sorted[pos]])
+        pos += 1
+    return entries
+
+
+def build_gene_col_index(df, header_table=None):
+    """
+    PATCH: Zentrales Parsing der Spalten.
+
+    Baut einen Index der Form:
+        gene_col_index[(gene, disease)] = {
+            'nat_q':   [col, ...],   # nationale Frage-Spalten
+            'nat_kom': [col, ...],   # nationale Kommentar-Spalten
+            'wiss_q':  [col, ...],   # wissenschaftl. Frage-Spalten
+            'wiss_kom':[col, ...],   # wissenschaftl. Kommentar-Spalten
+        }
+
+    Der Schlüssel ist immer der Genname + Erkrankung aus den NATIONALEN Spalten.
+    Wissenschaftliche Spalten werden per genes_compatible() + Erkrankungsname
+    zugeordnet (robust gegenüber BCL11/BCL11B- und CD79A/CD79-Tippfehlern).
+
+    header_table ist das Ergebnis von parse_headers(df.columns); wird es nicht
+    übergeben, werden die Header hier klassifiziert.
+
+    Gibt zurück:
+        gene_col_index  – dict wie oben beschrieben
+        gene_pairs      – geordnete Liste von (gene, disease) Tupeln
+        gene_display    – dict (gene, disease) -> disease string (für Anzeige)
+    """
+    if header_table is None:
+        header_table = parse_headers(df.columns)
+
+    # Schritt 1+2: nationale und wissenschaftliche Spalten in einem Durchgang
+    nat_entries = {}   # (gene, disease) -> {'q': col, 'kom': col}
+    nat_order = []     # Reihenfolge beibehalten
+    wiss_raw = {}      # (gene_wiss, disease_wiss) -> {'q': col, 'kom': col}
+
+    gene_headers = header_table[header_table['track'].notna()]
+    for col, track, gene, disease, is_comment in gene_headers.itertuples(index=False):
+        key = (gene, disease)
+        entries = nat_entries if track == 'nat' else wiss_raw
+        if key not in entries:
+            entries[key] = {'q': None, 'kom': None}
+            if track == 'nat':
+                nat_order.append(key)
+        entries[key]['kom' if is_comment else 'q'] = col
+
+    # Schritt 3: nationale Einträge mit wissenschaftlichen matchen
+    # Matching-Priorität:
+    #   1. Exakter Genname  + Erkrankung ist Substring
+    #   2. Kompatibler Genname + Erkrankung ist Substring  (BCL11 ↔ BCL11B)
+    #   3. Kompatibler Genname allein                      (CD79A ↔ CD79, korrupter Erkrankungsname)
+    # Die Kandidaten pro nationalem Gen kommen aus einem Gen-Index statt aus
+    # einem Vergleich mit allen wiss-Einträgen; bei gleicher Priorität gewinnt
+    # wie bisher der zuerst eingelesene wiss-Eintrag.
+    wiss_by_gene, wiss_genes_sorted = index_wiss_entries(wiss_raw)
+    gene_col_index = {}
+    for (nat_gene, nat_disease) in nat_order:
+        nat_disease_norm = nat_disease.lower().strip()
+        best_match = None
+        best_rank = None
+
+        for order, wiss_gene, wiss_disease_norm, wiss_cols in compatible_wiss_entries(
+                nat_gene, wiss_by_gene, wiss_genes_sorted):
+            disease_ok = (nat_disease_norm in wiss_disease_norm or
+                          wiss_disease_norm in nat_disease_norm)
+
+            if disease_ok:
+                priority = 1 if nat_gene == wiss_gene else 2
+            else:
+                priority = 3
+
+            if best_rank is None or (priority, order) < best_rank:
+                best_rank = (priority, order)
+                best_match = wiss_cols
+
+        gene_col_index[(nat_gene, nat_disease)] = {
+            'nat_q':    [nat_entries[(nat_gene, nat_disease)]['q']]
+                        if nat_entries[(nat_gene, nat_disease)]['q'] else [],
+            'nat_kom':  [nat_entries[(nat_gene, nat_disease)]['kom']]
+                        if nat_entries[(nat_gene, nat_disease)]['kom'] else [],
+            'wiss_q':   [best_match['q']]   if best_match and best_match['q']   else [],
+            'wiss_kom': [best_match['kom']]  if best_match and best_match['kom'] else [],
+        }
+
+    gene_pairs = nat_order  # geordnete Liste von (gene, disease) Tupeln
+    return gene_col_index, gene_pairs
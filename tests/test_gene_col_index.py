@@ -0,0 +1,218 @@
+"""
+Vergleich des indexbasierten Spalten-Matchings (survey_columns.build_gene_col_index)
+mit der ursprünglichen O(N×M)-Implementierung auf den Dummy-Umfragen aus docs/
+und auf Headern mit BCL11/BCL11B- und CD79/CD79A-Schreibweisen.
+
+Die Referenz unten ist der unveränderte frühere Code aus app.py (find()-basierte
+Header-Zerlegung, Vergleich jedes nationalen mit jedem wissenschaftlichen Eintrag).
+"""
+
+import random
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from survey_columns import build_gene_col_index
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+
+# ---------------------------------------------------------------------------
+# Referenz: ursprüngliche Implementierung
+# ---------------------------------------------------------------------------
+
+def reference_extract_gene_disease(col):
+    """
+    Extrahiert (gene, disease) aus einem LimeSurvey-Spaltenheader.
+    Gibt (None, None) zurück wenn das Format nicht erkannt wird.
+    """
+    if 'Gen:' not in col or 'Erkrankung:' not in col:
+        return None, None
+
+    gene_start = col.find('Gen:') + 4
+    while gene_start < len(col) and col[gene_start] in ' \xa0\t':
+        gene_start += 1
+    gene_end = col.find('Erkrankung:', gene_start)
+    if gene_end == -1:
+        return None, None
+    gene = col[gene_start:gene_end].strip(' \xa0\t')
+
+    disease_start = col.find('Erkrankung:') + 11
+    while disease_start < len(col) and col[disease_start] in ' \xa0\t':
+        disease_start += 1
+    disease_end = len(col)
+    for marker in [' [', '  ']:
+        pos = col.find(marker, disease_start)
+        if pos != -1 and pos < disease_end:
+            disease_end = pos
+    disease = col[disease_start:disease_end].strip(' \xa0\t')
+    return gene, disease
+
+
+def reference_genes_compatible(g1, g2):
+    """
+    True wenn zwei Gennamen als identisch gewertet werden sollen.
+    Behandelt den Fall dass LimeSurvey in national vs. wissenschaftlich
+    leicht abweichende Schreibweisen hat (z.B. BCL11 vs BCL11B, CD79A vs CD79).
+    Beide Richtungen werden geprüft (Prefix-Match).
+    """
+    if g1 == g2:
+        return True
+    longer, shorter = (g1, g2) if len(g1) > len(g2) else (g2, g1)
+    return longer.startswith(shorter)
+
+
+def reference_gene_col_index(df):
+    """
+    PATCH: Zentrales Parsing der Spalten.
+
+    Baut einen Index der Form:
+        gene_col_index[(gene, disease)] = {
+            'nat_q':   [col, ...],   # nationale Frage-Spalten
+            'nat_kom': [col, ...],   # nationale Kommentar-Spalten
+            'wiss_q':  [col, ...],   # wissenschaftl. Frage-Spalten
+            'wiss_kom':[col, ...],   # wissenschaftl. Kommentar-Spalten
+        }
+
+    Der Schlüssel ist immer der Genname + Erkrankung aus den NATIONALEN Spalten.
+    Wissenschaftliche Spalten werden per genes_compatible() + Erkrankungsname
+    zugeordnet (robust gegenüber BCL11/BCL11B- und CD79A/CD79-Tippfehlern).
+
+    Gibt zurück:
+        gene_col_index  – dict wie oben beschrieben
+        gene_pairs      – geordnete Liste von (gene, disease) Tupeln
+        gene_display    – dict (gene, disease) -> disease string (für Anzeige)
+    """
+    # Schritt 1: nationale Spalten einlesen
+    nat_entries = {}   # (gene, disease) -> {'q': col, 'kom': col}
+    nat_order = []     # Reihenfolge beibehalten
+
+    for col in df.columns:
+        if 'nationalen' not in col:
+            continue
+        gene, disease = reference_extract_gene_disease(col)
+        if not gene:
+            continue
+        key = (gene, disease)
+        if key not in nat_entries:
+            nat_entries[key] = {'q': None, 'kom': None}
+            nat_order.append(key)
+        if '[Kommentar]' in col:
+            nat_entries[key]['kom'] = col
+        else:
+            nat_entries[key]['q'] = col
+
+    # Schritt 2: wissenschaftliche Spalten einlesen
+    wiss_raw = {}   # (gene_wiss, disease_wiss) -> {'q': col, 'kom': col}
+    for col in df.columns:
+        if 'wissenschaftlicher' not in col:
+            continue
+        gene, disease = reference_extract_gene_disease(col)
+        if not gene:
+            continue
+        key = (gene, disease)
+        if key not in wiss_raw:
+            wiss_raw[key] = {'q': None, 'kom': None}
+        if '[Kommentar]' in col:
+            wiss_raw[key]['kom'] = col
+        else:
+            wiss_raw[key]['q'] = col
+
+    # Schritt 3: nationale Einträge mit wissenschaftlichen matchen
+    # Matching-Priorität:
+    #   1. Exakter Genname  + Erkrankung ist Substring
+    #   2. Kompatibler Genname + Erkrankung ist Substring  (BCL11 ↔ BCL11B)
+    #   3. Kompatibler Genname allein                      (CD79A ↔ CD79, korrupter Erkrankungsname)
+    gene_col_index = {}
+    for (nat_gene, nat_disease) in nat_order:
+        nat_disease_norm = nat_disease.lower().strip()
+        best_match = None
+        best_priority = 99
+
+        for (wiss_gene, wiss_disease), wiss_cols in wiss_raw.items():
+            wiss_disease_norm = wiss_disease.lower().strip()
+            gene_ok = reference_genes_compatible(nat_gene, wiss_gene)
+            exact_gene = (nat_gene == wiss_gene)
+            disease_ok = (nat_disease_norm in wiss_disease_norm or
+                          wiss_disease_norm in nat_disease_norm)
+
+            if exact_gene and disease_ok:
+                priority = 1
+            elif gene_ok and disease_ok:
+                priority = 2
+            elif gene_ok:
+                priority = 3
+            else:
+                continue
+
+            if priority < best_priority:
+                best_priority = priority
+                best_match = wiss_cols
+
+        gene_col_index[(nat_gene, nat_disease)] = {
+            'nat_q':    [nat_entries[(nat_gene, nat_disease)]['q']]
+                        if nat_entries[(nat_gene, nat_disease)]['q'] else [],
+            'nat_kom':  [nat_entries[(nat_gene, nat_disease)]['kom']]
+                        if nat_entries[(nat_gene, nat_disease)]['kom'] else [],
+            'wiss_q':   [best_match['q']]   if best_match and best_match['q']   else [],
+            'wiss_kom': [best_match['kom']]  if best_match and best_match['kom'] else [],
+        }
+
+    gene_pairs = nat_order  # geordnete Liste von (gene, disease) Tupeln
+    return gene_col_index, gene_pairs
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+NAT_PREFIX = ('Sollte folgendes Gen / Ekrankung in einem nationalen genomischen '
+              'Neugeborenenscreening berücksichtigt werden?')
+WISS_PREFIX = ('Sollte folgendes Gen / Ekrankung im Rahmen wissenschaftlicher Studien zum '
+               'genomischen Neugeborenenscreening berücksichtigt werden?')
+
+
+def survey_headers(pairs):
+    """Frage- und Kommentar-Header im LimeSurvey-Format für (Präfix, Gen, Erkrankung)."""
+    headers = []
+    for prefix, gene, disease in pairs:
+        headers.append(f'{prefix}  Gen: {gene}  Erkrankung: {disease} ')
+        headers.append(f'{prefix}  Gen: {gene}  Erkrankung: {disease} [Kommentar]')
+    return headers
+
+
+def assert_same_matching(columns):
+    df = pd.DataFrame(columns=columns)
+    assert build_gene_col_index(df) == reference_gene_col_index(df)
+
+
+@pytest.mark.parametrize('name', ['dummy_survey_data.csv', 'dummy_survey_20.csv'])
+def test_dummy_surveys(name):
+    columns = pd.read_csv(REPO_DIR / 'docs' / name, nrows=0, encoding='utf-8-sig').columns
+    assert_same_matching(list(columns))
+
+
+def test_bcl11_cd79_spellings():
+    columns = survey_headers([
+        (NAT_PREFIX,  'BCL11B', 'Immunodeficiency 49'),
+        (NAT_PREFIX,  'CD79A',  'Agammaglobulinemia 3'),
+        (NAT_PREFIX,  'CD79B',  'Agammaglobulinemia 6'),
+        (NAT_PREFIX,  'ABCD1',  'ABCD1-related adrenoleukodystrophy'),
+        (WISS_PREFIX, 'BCL11',  'Immunodeficiency 49'),
+        (WISS_PREFIX, 'CD79',   'Agammaglobulinemia'),
+        (WISS_PREFIX, 'CD79B',  'Agammaglobul1nemia 6'),
+        (WISS_PREFIX, 'ABCD1',  'ABCD1-related adrenoleukodystrophy'),
+    ])
+    assert_same_matching(columns)
+
+
+def test_random_header_sets():
+    rng = random.Random(20261017)
+    genes = ['BCL11', 'BCL11A', 'BCL11B', 'CD79', 'CD79A', 'CD79B', 'CD7', 'ABCD1', 'ABCD']
+    diseases = ['Immunodeficiency 49', 'Agammaglobulinemia 3', 'Agammaglobulinemia',
+                'Adrenoleukodystrophy', 'immunodeficiency']
+    for _ in range(300):
+        pairs = [(rng.choice([NAT_PREFIX, WISS_PREFIX]), rng.choice(genes), rng.choice(diseases))
+                 for _ in range(rng.randint(1, 12))]
+        assert_same_matching(survey_headers(pairs))